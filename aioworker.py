@@ -0,0 +1,110 @@
+'''
+asyncio adapters for the worker and the engine.
+
+AsyncWorker exposes a WorkerThreadServer (or WorkerProcessServer) to
+coroutines: jobs are awaitable Requests and posted messages are an async
+iterator. The worker thread wakes the event loop with call_soon_threadsafe
+when it posts, so nothing polls. AsyncEngine drives a Reversi game through
+one. Both need only a running asyncio loop: asyncio.run() in headless
+services, or Kivy's App.async_run(async_lib='asyncio').
+'''
+import asyncio
+
+from engine import Reversi
+from worker import BACKGROUND, INTERACTIVE, NORMAL, WorkerProcessServer, WorkerThreadServer
+
+
+class AsyncWorker:
+    ''' create it in a coroutine, on the running loop, or pass the loop '''
+    def __init__(self, worker, loop=None):
+        self.worker = worker
+        self.__loop = loop or asyncio.get_running_loop()
+        self.__posted = asyncio.Event()
+        self.__closed = False
+        worker.add_listener(self.__wake)
+
+    ''' wake messages(); a post can still come in after the loop has closed '''
+    def __wake(self):
+        try:
+            self.__loop.call_soon_threadsafe(self.__posted.set)
+        except RuntimeError:
+            pass # the loop is closed, nobody is waiting
+
+    ''' send func to the worker; return its Request, which can be awaited '''
+    def submit(self, func, priority=NORMAL, key=None):
+        return self.worker.send_message(func, priority, key)
+
+    async def run(self, func, priority=NORMAL, key=None):
+        return await self.submit(func, priority, key)
+
+    ''' posted messages as (msg, args, request id), until close() '''
+    async def messages(self):
+        while not self.__closed:
+            self.__posted.clear() # before draining, so no post goes unnoticed
+            drained = list(self.worker.messages())
+            for message in drained:
+                yield message
+            if not drained:
+                await self.__posted.wait()
+
+    def close(self):
+        self.__closed = True
+        self.worker.remove_listener(self.__wake)
+        self.__wake()
+
+
+class AsyncEngine:
+    '''
+    A Reversi game on its own worker ('thread' or 'process' backend), with
+    the jobs the app sends it as coroutines; progress (search_stats,
+    analysis, ...) comes through messages(). Create it as AsyncWorker.
+    '''
+    def __init__(self, dim=8, backend='thread', log=lambda _: None, loop=None):
+        self.worker = WorkerProcessServer() if backend == 'process' else WorkerThreadServer()
+        self.game = Reversi(dim, self.worker.post, log)
+        self.game.cancelled = self.worker.is_cancelled
+        if backend == 'process':
+            self.game.run_search = self.worker.run
+        self.aio = AsyncWorker(self.worker, loop)
+
+    def messages(self):
+        return self.aio.messages()
+
+    async def new_game(self):
+        await self.aio.run(self.game.new_game, INTERACTIVE)
+
+    ''' play (row, col) for the side to move, if legal; return whether it was '''
+    async def user_move(self, row, col):
+        def move():
+            played = len(self.game.board.playLog)
+            self.game.player = self.game.turn ^ 1
+            self.game.do_user_move(row, col)
+            return len(self.game.board.playLog) > played
+        return await self.aio.run(move, INTERACTIVE)
+
+    ''' let the machine play the side to move (passing if it must); return its move, or None '''
+    async def machine_move(self):
+        def move():
+            played = len(self.game.board.playLog)
+            self.game.player = self.game.turn
+            self.game.do_machine_move()
+            return self.game.board.playLog[-1][1] if len(self.game.board.playLog) > played else None
+        return await self.aio.run(move, INTERACTIVE)
+
+    async def undo(self):
+        await self.aio.run(self.game.undo_turn, INTERACTIVE)
+
+    ''' Reversi.analyze of the current position; a new analysis cancels the one before '''
+    async def analyze(self, depth=None, time_budget=None, multipv=None):
+        position = self.game.state()
+        return await self.aio.run(lambda: self.game.analyze(position, depth, time_budget, multipv), BACKGROUND, key='analysis')
+
+    ''' stop the job in flight, see WorkerThreadServer.cancel '''
+    def cancel(self):
+        self.worker.cancel()
+
+    def close(self):
+        self.aio.close()
+        self.worker.cancel()
+        self.worker.stop()
+        self.game.close()
@@ -0,0 +1,73 @@
+'''
+Batched bitboard primitives over NumPy uint64 arrays, for processing
+many positions at once (self-play, book building, game archives).
+
+Each function is the vectorised counterpart of the scalar one in
+bitboard.py, with the same directional shifts and edge masks applied to
+a whole array of boards, and gives the same results board by board.
+Arguments may be arrays or sequences of ints and broadcast together.
+'''
+import numpy as np
+
+from bitboard import DIRECTIONS
+
+# numpy 1.x turns uint64 op Python int into float64, so every operand is a uint64
+_DIRECTIONS = tuple((np.uint64(s), np.uint64(mask)) for s, mask in DIRECTIONS)
+_ZERO, _ONE = np.uint64(0), np.uint64(1)
+_M1, _M2, _M4 = np.uint64(0x5555555555555555), np.uint64(0x3333333333333333), np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01, _56 = np.uint64(0x0101010101010101), np.uint64(56)
+
+
+def boards(b):
+    return np.asarray(b, dtype=np.uint64)
+
+
+def moves(P, O):
+    ''' legal moves for each P, as bitmasks '''
+    P, O = boards(P), boards(O)
+    m = np.zeros(np.broadcast(P, O).shape, np.uint64)
+    for s, mask in _DIRECTIONS:
+        o = O & mask
+        for shift in (np.left_shift, np.right_shift):
+            t = o & shift(P, s)
+            for _ in range(5):
+                t |= o & shift(t, s)
+            m |= shift(t, s)
+    return m & ~(P | O)
+
+
+def flips(P, O, sq):
+    ''' discs flipped when each P plays on the corresponding square of sq '''
+    P, O = boards(P), boards(O)
+    x = np.left_shift(_ONE, np.asarray(sq, dtype=np.uint64))
+    f = np.zeros(np.broadcast(P, O, x).shape, np.uint64)
+    for s, mask in _DIRECTIONS:
+        o = O & mask
+        for shift in (np.left_shift, np.right_shift):
+            t = o & shift(x, s)
+            for _ in range(5):
+                t |= o & shift(t, s)
+            # the square past the run of opponent discs must be P's
+            f |= np.where(shift(t, s) & P != _ZERO, t, _ZERO)
+    return f
+
+
+def play(P, O, sq):
+    ''' return the (opponent, player) arrays after each P plays on sq '''
+    P, O = boards(P), boards(O)
+    f = flips(P, O, sq)
+    return O ^ f, P | f | np.left_shift(_ONE, np.asarray(sq, dtype=np.uint64))
+
+
+def popcount(b):
+    ''' number of set bits of each board '''
+    b = boards(b)
+    b = b - ((b >> _ONE) & _M1)
+    b = (b & _M2) + ((b >> np.uint64(2)) & _M2)
+    b = (b + (b >> np.uint64(4))) & _M4
+    return ((b * _H01) >> _56).astype(np.int64)
+
+
+def counts(P, O):
+    ''' return the (P, O) disc counts '''
+    return popcount(P), popcount(O)
@@ -0,0 +1,153 @@
+'''
+8x8 bitboard primitives.
+
+Square index is row * 8 + col, with row 0 at the top of the board;
+a position is a pair of 64-bit ints (player to move, opponent).
+'''
+
+SIZE = 8
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# opponent discs that can be "in between" for each direction; the edge
+# files / ranks are masked off so that the flood fill cannot wrap around
+NOT_EDGE_COLS = 0x7E7E7E7E7E7E7E7E
+NOT_EDGE_ROWS = 0x00FFFFFFFFFFFF00
+NOT_EDGE = NOT_EDGE_COLS & NOT_EDGE_ROWS
+
+# (shift, mask) for the four axes; each is walked both ways, left shifts
+# move towards higher square indices and right shifts towards lower ones
+DIRECTIONS = ((1, NOT_EDGE_COLS), (8, NOT_EDGE_ROWS), (7, NOT_EDGE), (9, NOT_EDGE))
+
+CORNERS = 0x8100000000000081
+
+# initial position, black moves first
+START_BLACK = 0x0000000810000000
+START_WHITE = 0x0000001008000000
+
+
+def square_name(sq):
+    return 'abcdefgh'[sq % SIZE] + str(sq // SIZE + 1)
+
+
+def parse_square(name):
+    ''' inverse of square_name, e.g. 'f5' -> 37 '''
+    col, row = 'abcdefgh'.index(name[0].lower()), int(name[1:]) - 1
+    if not 0 <= row < SIZE:
+        raise ValueError('bad square: {}'.format(name))
+    return row * SIZE + col
+
+
+def popcount(b):
+    return bin(b).count('1')
+
+
+def final_margin(P, O):
+    ''' disc margin of a finished game for P, empty squares go to the winner '''
+    p, o = popcount(P), popcount(O)
+    if p > o:
+        return 64 - 2 * o
+    if p < o:
+        return 2 * p - 64
+    return 0
+
+
+def squares(b):
+    ''' yield the indices of the set bits, lowest first '''
+    while b:
+        low = b & -b
+        yield low.bit_length() - 1
+        b ^= low
+
+
+def moves(P, O):
+    ''' legal moves for P, as a bitmask '''
+    empty = ~(P | O) & FULL
+    m = 0
+    for s, mask in DIRECTIONS:
+        o = O & mask
+        t = o & (P << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        t |= o & (t << s)
+        m |= t << s
+
+        t = o & (P >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        t |= o & (t >> s)
+        m |= t >> s
+    return m & empty
+
+
+def flips(P, O, sq):
+    ''' discs flipped when P plays on square sq '''
+    f = 0
+    x = 1 << sq
+    for s, mask in DIRECTIONS:
+        o = O & mask
+
+        t = 0
+        y = x << s
+        while y & o:
+            t |= y
+            y <<= s
+        if y & P:
+            f |= t
+
+        t = 0
+        y = x >> s
+        while y & o:
+            t |= y
+            y >>= s
+        if y & P:
+            f |= t
+    return f
+
+
+def play(P, O, sq):
+    ''' return the (opponent, player) pair after P plays on sq '''
+    f = flips(P, O, sq)
+    return O ^ f, P | f | (1 << sq)
+
+
+def flip_vertical(b):
+    ''' mirror top to bottom '''
+    return int.from_bytes(b.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(b):
+    ''' mirror left to right '''
+    b = ((b >> 1) & 0x5555555555555555) | ((b & 0x5555555555555555) << 1)
+    b = ((b >> 2) & 0x3333333333333333) | ((b & 0x3333333333333333) << 2)
+    return ((b >> 4) & 0x0F0F0F0F0F0F0F0F) | ((b & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def transpose(b):
+    ''' mirror about the a1-h8 diagonal: (row, col) -> (col, row) '''
+    t = 0x0F0F0F0F00000000 & (b ^ (b << 28))
+    b ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (b ^ (b << 14))
+    b ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (b ^ (b << 7))
+    b ^= t ^ (t >> 7)
+    return b
+
+
+def _rotate(b):
+    return flip_vertical(mirror_horizontal(b))
+
+# the 8 symmetries of the square, as (transform, inverse) pairs
+SYMMETRIES = (
+    (lambda b: b, lambda b: b),
+    (mirror_horizontal, mirror_horizontal),
+    (flip_vertical, flip_vertical),
+    (_rotate, _rotate),
+    (transpose, transpose),
+    (lambda b: mirror_horizontal(transpose(b)), lambda b: transpose(mirror_horizontal(b))),
+    (lambda b: flip_vertical(transpose(b)), lambda b: transpose(flip_vertical(b))),
+    (lambda b: _rotate(transpose(b)), lambda b: transpose(_rotate(b))),
+)
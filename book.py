@@ -0,0 +1,139 @@
+'''
+Opening book: a sorted array of fixed-size records (canonical position
+hash, best move, score), memory-mapped and binary-searched, so opening a
+book costs the same no matter how many positions it holds.
+
+Positions are canonicalised over the 8 board symmetries before hashing;
+the stored move is in the canonical orientation and is mapped back to
+the actual board on lookup.
+'''
+from collections import defaultdict
+import mmap
+import struct
+
+from bitboard import SYMMETRIES, moves, play
+from tt import zobrist
+
+MAGIC = b'RVBK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ') # magic, version, record size, record count
+RECORD = struct.Struct('<QhBB') # key, score (disc margin), move, games (capped at 255)
+
+
+def canonical(P, O):
+    ''' return (key, symmetry index) of the canonical orientation of (P, O) '''
+    best, index = None, 0
+    for i, (transform, _) in enumerate(SYMMETRIES):
+        pos = transform(P), transform(O)
+        if best is None or pos < best:
+            best, index = pos, i
+    return zobrist(*best)[0], index
+
+
+class BookError(Exception):
+    pass
+
+
+class Book:
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise BookError('{}: truncated header'.format(filename))
+            magic, version, size, self.count = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or size != RECORD.size:
+                raise BookError('{}: not a version {} book'.format(filename, VERSION))
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__map) < HEADER.size + self.count * RECORD.size:
+            raise BookError('{}: truncated'.format(filename))
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.__map.close()
+
+    def record(self, i):
+        return RECORD.unpack_from(self.__map, HEADER.size + i * RECORD.size)
+
+    ''' return (key, score, move, games) for a canonical key, or None '''
+    def find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            rec = self.record(mid)
+            if rec[0] < key:
+                lo = mid + 1
+            elif rec[0] > key:
+                hi = mid
+            else:
+                return rec
+        return None
+
+    ''' return (square, score) of the book move for P, or None '''
+    def lookup(self, P, O):
+        key, sym = canonical(P, O)
+        rec = self.find(key)
+        if rec is None:
+            return None
+        _, score, move, _ = rec
+        sq = SYMMETRIES[sym][1](1 << move).bit_length() - 1
+        if not moves(P, O) >> sq & 1:
+            return None # hash collision
+        return sq, score
+
+
+class BookBuilder:
+    '''
+    Collect the outcomes of the moves played in a set of games, then write
+    the best-scoring move (by average final margin) of each position that
+    was reached at least min_games times.
+    '''
+    def __init__(self, max_ply=20, min_games=2):
+        self.max_ply = max_ply
+        self.min_games = min_games
+        # canonical key -> canonical move -> [games, sum of margins]
+        self.stats = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    ''' add a game, as returned by replay(), with the final margin for the first mover '''
+    def add_game(self, game, margin):
+        for P, O, sq, sign in game[:self.max_ply]:
+            key, sym = canonical(P, O)
+            move = SYMMETRIES[sym][0](1 << sq).bit_length() - 1
+            stats = self.stats[key][move]
+            stats[0] += 1
+            stats[1] += sign * margin
+        return self
+
+    def records(self):
+        for key, candidates in self.stats.items():
+            candidates = [ (total / games, move, games) for move, (games, total) in candidates.items() if games >= self.min_games ]
+            if candidates:
+                score, move, games = max(candidates)
+                yield key, int(round(score)), move, min(games, 255)
+
+    def write(self, filename):
+        records = sorted(self.records())
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(records)))
+            for rec in records:
+                f.write(RECORD.pack(*rec))
+        return len(records)
+
+
+'''
+Replay the squares played from (P, O), inferring passes. Return the
+game as (P, O, square, sign) for each move, where sign is 1 if the
+first mover is to move and -1 otherwise, and the final (P, O) pair.
+'''
+def replay(played, P, O):
+    game, sign = [], 1
+    for sq in played:
+        if not moves(P, O) >> sq & 1:
+            P, O, sign = O, P, -sign # pass
+            if not moves(P, O) >> sq & 1:
+                raise ValueError('illegal move: {}'.format(sq))
+        game.append((P, O, sq, sign))
+        P, O, sign = play(P, O, sq) + (-sign,)
+    return game, (P, O) if sign > 0 else (O, P)
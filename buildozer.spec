@@ -13,7 +13,7 @@ package.domain = com.tableau
 source.dir = .
 
 # (list) Source files to include (let empty to include all the files)
-source.include_exts = py,png,jpg,kv,atlas,json
+source.include_exts = py,png,jpg,kv,atlas,json,bin
 
 # (list) List of inclusions using pattern matching
 #source.include_patterns = assets/*,images/*.png
@@ -22,7 +22,7 @@ source.include_exts = py,png,jpg,kv,atlas,json
 source.exclude_exts = spec,pyx,data,so
 
 # (list) List of directory to exclude (let empty to not exclude anything)
-source.exclude_dirs = tests, bin, kivy_env, kivy_env8, __pycache__, p4a-recipes
+source.exclude_dirs = tests, tools, bin, kivy_env, kivy_env8, __pycache__, p4a-recipes
 
 # (list) List of exclusions using pattern matching
 source.exclude_patterns = license,images/*/*.jpg,test*.py,bitutils.py,game.py
@@ -1,30 +1,82 @@
-from GameLogic import Reversi, NOBODY, player_name
-from worker import Locking, WorkerThreadServer
+import json
+import os
+
+# REVERSI_ENGINE=GameLogic selects the compiled extension; it searches to a
+# fixed depth, and has no levels, files, redo or cancellable searches
+COMPILED = os.environ.get('REVERSI_ENGINE') == 'GameLogic'
+if COMPILED:
+    from GameLogic import Reversi, NOBODY, player_name, int_to_bits
+    DEFAULT_LEVEL, LEVELS = None, {}
+else:
+    from engine import DEFAULT_LEVEL, LEVELS, Reversi, NOBODY, player_name, int_to_bits
+from worker import BACKGROUND, INTERACTIVE, Locking, WorkerProcessServer, WorkerThreadServer
 from utils import is_mobile
 
 
 class Controller(Locking):
-    def __init__(self, board_size, dispatch, scheduler, log):
+    def __init__(self, board_size, dispatch, scheduler, log, time_budget=1.0, tt_size_mb=16, endgame_empties=10, book=None, patterns=None, probcut=None, search_workers=1, ponder=None, stats_log=None, level=None, backend='thread'):
         super().__init__()
-        self.__replay = None
-        self.__before_replay = None # (board, turn, undo)
+        self.__replay = None # moves left to show
+        self.__before_replay = None # (plies, turn), or (board, turn, undo) with the compiled engine
         self.__dispatch = dispatch
         self.__scheduler = scheduler
-        self.__work = WorkerThreadServer()
+        # 'process': the machine's search runs in a child process, off the UI thread's GIL
+        self.__work = WorkerProcessServer() if backend == 'process' and not COMPILED else WorkerThreadServer()
         self.__game = Reversi(board_size, self.__work.post, log)
-        self.__game.lookAhead = 4
+        self.__level = None # a LEVELS preset, in place of time_budget and endgame_empties
+        if COMPILED:
+            self.__game.lookAhead = 4
+        else:
+            self.__game.cancelled = self.__work.is_cancelled
+            if backend == 'process':
+                self.__game.run_search = self.__work.run
+            self.__game.time_budget = time_budget # seconds per machine move
+            self.__game.tt_size_mb = tt_size_mb
+            self.__game.endgame_empties = endgame_empties
+            # > 1: parallel root split, not on mobile; the engine's pvs searches its aspiration windows serially, so it splits little
+            self.__game.search_workers = search_workers
+            if level:
+                self.__level = level
+                self.__game.set_level(level)
+            if ponder is None:
+                ponder = not is_mobile() and backend != 'process' # pondering would hold the GIL in this process
+            if ponder:
+                self.__work.set_idle_task(self.__game.ponder) # think on the user's time
+            if book and os.path.exists(book):
+                self.__game.open_book(book)
+            if patterns and os.path.exists(patterns):
+                self.__game.open_patterns(patterns)
+            if probcut and os.path.exists(probcut):
+                self.__game.open_probcut(probcut)
+        self.__stats_log = stats_log # file to append the final search_stats of each machine move to, as JSON lines
+        self.__error = None # what the last failed job raised, until the next job is sent
         self.__state = {}
         self.update_state()
 
     def accepting_input(self):
         return not self.is_replay()
         
+    ''' call listener, from the posting thread, whenever a message is posted for dispatch_messages '''
+    def add_message_listener(self, listener):
+        self.__work.add_listener(listener)
+
+    '''
+    Dispatch the worker's messages; analysis and error messages get the
+    id of the worker.Request that posted them as their last argument
+    '''
     def dispatch_messages(self, *_):
-        for msg, args in self.__work.messages():
+        for msg, args, request_id in self.__work.messages():
             if msg is None:
                 continue            
             if msg == 'cannot_move':
                 args = (player_name(*args),)
+            elif msg == 'search_stats' and self.__stats_log and args[0]['final']:
+                self.log_search_stats(*args)
+            elif msg == 'analysis':
+                args += (request_id,)
+            elif msg == 'error':
+                self.__error = args[0]
+                args += (request_id,)
             self.__dispatch(msg, args)
 
     @property
@@ -42,11 +94,13 @@ class Controller(Locking):
     def state(self, new_state):
         self.set_state(new_state)
    
-    ''' wrap func in update calls '''
+    ''' wrap func in update calls; user actions run ahead of background work. Return func's worker.Request '''
     def send_message(self, func):
+        self.__error = None
         self.update_state()
-        self.__work.send_message(func)
-        self.__work.send_message(self.update_state)
+        request = self.__work.send_message(func, INTERACTIVE)
+        self.__work.send_message(self.update_state, INTERACTIVE)
+        return request
 
     @property
     def board_size(self):
@@ -65,6 +119,7 @@ class Controller(Locking):
 
     def move(self, row, col):
         if self.accepting_input():
+            self.__work.interrupt() # stop pondering
             self.__game.do_user_move(row, col)
 
     def next(self, *_):
@@ -74,27 +129,75 @@ class Controller(Locking):
             self.send_message(self.__game.do_machine_move)
 
     def new_game(self):
+        self.__work.cancel()
         def start_new_game(*_):
             self.__game.new_game()
             self.__work.post('ready')
         self.send_message(start_new_game)
 
+    '''
+    Score the moves of the current position on the worker thread, see
+    Reversi.analyze. Return a worker.Request for the final analysis; the
+    analysis messages of each depth carry its id. A new analysis cancels
+    the one before, and the messages it has not delivered yet are dropped.
+    Return None with the compiled engine, which cannot analyze.
+    '''
+    def analyze(self, multipv=None, depth=None, time_budget=None):
+        if COMPILED:
+            return None
+        position = self.__game.state()
+        def analyze(*_):
+            return self.__game.analyze(position, depth, time_budget, multipv)
+        request = self.__work.send_message(analyze, BACKGROUND, key='analysis')
+        return request
+
+    ''' worker queue depth and wait times by priority '''
+    def queue_stats(self):
+        return self.__work.stats()
+
+    @staticmethod
+    def levels():
+        return list(LEVELS)
+
+    @staticmethod
+    def default_level():
+        return DEFAULT_LEVEL
+
+    @property
+    def level(self):
+        return self.__level
+
+    ''' switch to one of levels(), from the next machine move on '''
+    def set_level(self, level):
+        if level not in LEVELS:
+            return # saved by a build with other levels, or the compiled engine
+        self.__level = level
+        self.__work.send_message(lambda: self.__game.set_level(level), INTERACTIVE)
+
     def owner(self, row, col):
         return self.__game.board.owner(row, col)
 
     def replay(self, *_):
+        self.__work.cancel() # stop the AI's search
         self.__work.pause() # pause the AI
-        self.__replay = self.__game.board.playLog.copy()
-        self.__before_replay = (self.__game.board, self.__game.turn, self.__game.undo)
-        self.__game.new_game()
+        if COMPILED:
+            self.__replay = self.__game.board.playLog.copy()
+            self.__before_replay = (self.__game.board, self.__game.turn, self.__game.undo)
+            self.__game.new_game()
+        else:
+            self.__before_replay = (len(self.__game.undo), self.__game.turn)
+            self.__replay = self.__before_replay[0]
+            self.__game.seek(0)
         self.update_state()
         self.schedule_once(self.__replay_next, 1)
 
     def __replay_next(self):
-        if self.__replay:
-            player, move = self.__replay[0]
-            self.__replay = self.__replay[1:]
+        if self.__replay and COMPILED:
+            player, move = self.__replay.pop(0)
             self.__game.play_with_undo(player, move, undo=False, update=True)
+        elif self.__replay:
+            self.__replay -= 1
+            self.__game.redo_move()
         elif self.__before_replay:
             if self.__work.resume():
                 self.send_message(self.__replay_cancelled)
@@ -107,27 +210,43 @@ class Controller(Locking):
             self.__replay = None # cancel it
 
     def quit(self):
+        self.__work.cancel()
         self.__work.stop()
+        if not COMPILED:
+            self.__game.close()
 
     def switch(self):
+        self.__work.cancel()
         self.send_message(self.__game.switch)
 
     def undo(self):
+        self.__work.cancel()
         self.send_message(self.__game.undo_turn)
+
+    def redo(self):
+        def redo_turn():
+            self.__game.redo_turn()
+            if self.__game.turn == self.__game.player:
+                self.__work.post('ready') # undone while the machine was thinking: it has yet to reply
+        if not COMPILED:
+            self.send_message(redo_turn)
         
     def update_state(self):
         replay = bool(self.__replay)
         game_over = self.__game.is_game_over()
         busy = not game_over and not replay and self.__game.turn==self.__game.player
         working = busy or replay
+        # new, switch and undo cancel a machine move in progress, but the compiled engine's cannot be
+        blocked = working if COMPILED else replay
         state = {
             'ai_busy': busy,
             'replay': replay,
             'game_over': game_over,
-            'can_new':  not working and not self.__game.is_new_game(),
+            'can_new':  not blocked and not self.__game.is_new_game(),
             'can_replay': not working and self.__game.can_undo(),
-            'can_switch': not working and not game_over,
-            'can_undo': not working and self.__game.can_undo(),
+            'can_switch': not blocked and not game_over,
+            'can_undo': not blocked and self.__game.can_undo(),
+            'can_redo': not working and not COMPILED and self.__game.can_redo(),
         }
         state = self.set_state(state)
         if game_over and not state['game_over']:
@@ -137,7 +256,9 @@ class Controller(Locking):
 
     def status_info(self):
         state = self.state
-        if state['ai_busy']:
+        if self.__error:
+            info = 'Error: {}'.format(self.__error)
+        elif state['ai_busy']:
             info = 'Thinking...'
         elif state['game_over'] and not state['replay']:
             winner = 'NOBODY'
@@ -160,6 +281,25 @@ class Controller(Locking):
     def is_nobody(player):
         return player == NOBODY
 
+    def log_search_stats(self, stats):
+        try:
+            with open(self.__stats_log, 'a') as f:
+                f.write(json.dumps(stats) + '\n')
+        except OSError:
+            self.__stats_log = None # don't keep failing
+
+    @staticmethod
+    def format_search_stats(stats):
+        if stats['source'] == 'book':
+            return 'book move {}'.format(stats['move'])
+        info = '{} depth {}, {:.0f} nodes/s, tt {:.0%}'.format(stats['source'], stats['depth'], stats['nps'], stats['tt_hit_rate'])
+        if stats['move']:
+            info += ', best {}'.format(stats['move'])
+            if stats['score'] is not None:
+                score = '{:+.1f}' if stats['units'] == 'discs' else 'eval {:+d}'
+                info += ' ({})'.format(score.format(stats['score']))
+        return info
+
     @staticmethod
     def format_score(score):
         return '{}: {}, {}: {}'.format(player_name(0), score[0], player_name(1), score[1])
@@ -172,7 +312,11 @@ class Controller(Locking):
         return player_name(self.__game.player)
 
     def __replay_cancelled(self):
-        self.__game.board, self.__game.turn, self.__game.undo = self.__before_replay
+        if COMPILED:
+            self.__game.board, self.__game.turn, self.__game.undo = self.__before_replay
+        else:
+            plies, self.__game.turn = self.__before_replay
+            self.__game.seek(plies)
         self.__before_replay = None
 
     @property
@@ -0,0 +1,176 @@
+'''
+Exact endgame solver.
+
+Scores are final disc margins for the side to move (empty squares go
+to the winner). Nodes with many empties are ordered fastest-first
+(fewest opponent replies) and share the transposition table with the
+midgame search; shallower nodes are ordered by quadrant parity, and the
+last empty square is resolved by counting flips.
+'''
+from time import perf_counter
+from bitboard import FULL, final_margin, flips, moves, popcount, squares
+from search import DISC_VALUE, SearchTimeout
+from tt import EXACT, LOWER, UPPER, NO_MOVE, TranspositionTable, zobrist, zobrist_play
+
+EXACT_MODE, WLD_MODE = 'exact', 'wld'
+MAX_MARGIN = 64
+
+DEEP_MIN_EMPTIES = 7 # fastest-first ordering and table lookups from here up
+CORNERS = 0x8100000000000081
+
+# board quadrants; parity holds one bit per quadrant with an odd number of empties
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+QUADRANT_BIT = [ next(1 << i for i, q in enumerate(QUADRANTS) if q >> sq & 1) for sq in range(64) ]
+PARITY_MASK = [ sum(q for i, q in enumerate(QUADRANTS) if p >> i & 1) for p in range(16) ]
+
+
+def parity(empty):
+    return sum(1 << i for i, q in enumerate(QUADRANTS) if popcount(empty & q) & 1)
+
+
+def last1(P, O, sq):
+    ''' score for P with a single empty square left '''
+    n = popcount(P)
+    f = flips(P, O, sq)
+    if f:
+        return 2 * (n + popcount(f)) - 62
+    f = flips(O, P, sq)
+    if f:
+        return 2 * (n - popcount(f)) - 64
+    return 2 * n - 62 if 2 * n > 63 else 2 * n - 64 # nobody can play it
+
+
+class EndgameSolver:
+    def __init__(self, tt=None):
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.nodes = 0
+        self.stop = None # callable, polled in deep nodes; SearchTimeout when it returns True
+        self.deadline = None # perf_counter() time, checked in deep nodes; SearchTimeout past it
+
+    ''' no move lists or ordering: empties in odd quadrants first, then the rest '''
+    def shallow(self, P, O, alpha, beta, empty, n, par, passed=False):
+        self.nodes += 1
+        if n == 1:
+            return last1(P, O, empty.bit_length() - 1)
+        best = -MAX_MARGIN - 1
+        odd = PARITY_MASK[par]
+        for group in (empty & odd, empty & ~odd):
+            while group:
+                low = group & -group
+                group ^= low
+                sq = low.bit_length() - 1
+                f = flips(P, O, sq)
+                if not f:
+                    continue
+                score = -self.shallow(O ^ f, P | f | low, -beta, -alpha, empty ^ low, n - 1, par ^ QUADRANT_BIT[sq])
+                if score > best:
+                    best = score
+                    if score > alpha:
+                        alpha = score
+                        if alpha >= beta:
+                            return best
+        if best > -MAX_MARGIN - 1:
+            return best
+        if passed:
+            return final_margin(P, O)
+        return -self.shallow(O, P, -beta, -alpha, empty, n, par, True)
+
+    ''' fastest-first ordered search, backed by the transposition table '''
+    def deep(self, P, O, alpha, beta, empty, n, par, k, ks):
+        self.nodes += 1
+        # deep nodes are few and costly, unlike the shallow ones below them
+        if (self.stop and self.stop()) or (self.deadline and perf_counter() > self.deadline):
+            raise SearchTimeout
+        m = moves(P, O)
+        if not m:
+            if not moves(O, P):
+                return final_margin(P, O)
+            return -self.deep(O, P, -beta, -alpha, empty, n, par, ks, k)
+
+        tt = self.tt
+        tt_move = NO_MOVE
+        entry = tt.probe(k)
+        if entry:
+            tt_depth, bound, score, tt_move = entry
+            if tt_depth >= n:
+                # entries may come from the midgame search, which scales scores by DISC_VALUE
+                if bound == EXACT:
+                    return score // DISC_VALUE
+                if bound == LOWER:
+                    alpha = max(alpha, -(-score // DISC_VALUE))
+                else:
+                    beta = min(beta, score // DISC_VALUE)
+                if alpha >= beta:
+                    return alpha if bound == LOWER else beta
+
+        order = self.order(P, O, m, par, tt_move)
+        alpha0, best, best_move = alpha, -MAX_MARGIN - 1, NO_MOVE
+        for _, sq, f in order:
+            low = 1 << sq
+            if n - 1 > DEEP_MIN_EMPTIES:
+                k2, ks2 = zobrist_play(k, ks, f, sq)
+                score = -self.deep(O ^ f, P | f | low, -beta, -alpha, empty ^ low, n - 1, par ^ QUADRANT_BIT[sq], k2, ks2)
+            else:
+                score = -self.shallow(O ^ f, P | f | low, -beta, -alpha, empty ^ low, n - 1, par ^ QUADRANT_BIT[sq])
+            if score > best:
+                best, best_move = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        bound = LOWER if best >= beta else UPPER if best <= alpha0 else EXACT
+        tt.store(k, n, bound, best * DISC_VALUE, best_move)
+        return best
+
+    ''' return [(key, square, flips)] sorted by opponent mobility, odd quadrants and corners first '''
+    @staticmethod
+    def order(P, O, m, par, first=NO_MOVE):
+        odd = PARITY_MASK[par]
+        order = []
+        for sq in squares(m):
+            f = flips(P, O, sq)
+            low = 1 << sq
+            if sq == first:
+                key = -100
+            else:
+                key = 4 * popcount(moves(O ^ f, P | f | low))
+                if not odd & low:
+                    key += 2
+                if CORNERS & low:
+                    key -= 3
+            order.append((key, sq, f))
+        order.sort()
+        return order
+
+    ''' score of the position for P; exact inside (alpha, beta), a bound outside '''
+    def solve(self, P, O, alpha=-MAX_MARGIN, beta=MAX_MARGIN):
+        empty = ~(P | O) & FULL
+        n = popcount(empty)
+        if n <= DEEP_MIN_EMPTIES:
+            return self.shallow(P, O, alpha, beta, empty, n, parity(empty))
+        return self.deep(P, O, alpha, beta, empty, n, parity(empty), *zobrist(P, O))
+
+    '''
+    Return (square, score) of the best move for P. In WLD_MODE the score only
+    says win (1), draw (0) or loss (-1), which is much cheaper to prove.
+    '''
+    def best_move(self, P, O, mode=EXACT_MODE):
+        self.nodes = 0
+        self.tt.new_search()
+        alpha, beta = (-1, 1) if mode == WLD_MODE else (-MAX_MARGIN, MAX_MARGIN)
+        empty = ~(P | O) & FULL
+        n, par = popcount(empty), parity(empty)
+        k, _ = zobrist(P, O)
+        entry = self.tt.probe(k)
+        best, best_move = -MAX_MARGIN - 1, None
+        for _, sq, f in self.order(P, O, moves(P, O), par, entry[3] if entry else NO_MOVE):
+            score = -self.solve(O ^ f, P | f | (1 << sq), -beta, -alpha)
+            if score > best:
+                best, best_move = score, sq
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        if mode == WLD_MODE:
+            best = max(-1, min(1, best))
+        return best_move, best
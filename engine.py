@@ -0,0 +1,675 @@
+'''
+Pure-Python Reversi engine, a drop-in replacement for the compiled
+GameLogic extension: same Reversi / Board surface, bitboard internals.
+'''
+from time import perf_counter
+
+from bitboard import SIZE, flips, moves, play, popcount, squares
+from book import Book
+from endgame import EXACT_MODE, EndgameSolver
+from largeboard import LargeBoardSearch, geometry
+from parallel import ParallelSearch
+from patterns import PatternEvaluator
+from probcut import ProbCut, fingerprint
+from search import DISC_VALUE, MAX_DEPTH, Search, SearchTimeout, evaluate
+from tt import DEFAULT_SIZE_MB, TranspositionTable, zobrist
+
+WHITE, BLACK, NOBODY = 0, 1, -1
+
+PLAYER_NAMES = [ 'WHITE', 'BLACK' ]
+STATS_INTERVAL = 0.5 # seconds between search_stats messages
+ENDGAME_TIME_SHARE = .5 # of the time budget, for the endgame solver; if it runs out, the midgame search plays
+
+# difficulty levels: a node budget per move plays the same moves on any
+# hardware (with one search worker), a time budget plays to the hardware;
+# timed levels only solve endgames that pure Python finishes well within
+# ENDGAME_TIME_SHARE of their budget, even on a phone (tools/level_bench.py)
+LEVELS = {
+    'novice': dict(node_budget=1000, endgame_empties=6),
+    'easy': dict(node_budget=5000, endgame_empties=8),
+    'medium': dict(node_budget=25000, endgame_empties=10),
+    'hard': dict(node_budget=100000, endgame_empties=12),
+    '1 second': dict(time_budget=1.0, endgame_empties=10),
+    '5 seconds': dict(time_budget=5.0, endgame_empties=12),
+}
+DEFAULT_LEVEL = '1 second'
+
+# what a search process needs to know besides the position, see Reversi.search_job
+SEARCH_SETTINGS = ( 'lookAhead', 'time_budget', 'node_budget', 'endgame_empties', 'endgame_mode', 'tt_size_mb', 'pvs' )
+
+
+def player_name(player):
+    return PLAYER_NAMES[player] if player != NOBODY else 'NOBODY'
+
+
+def int_to_bits(b, dim):
+    return [(b >> i) & 1 for i in range(dim * dim)]
+
+
+class Board:
+    ''' Disc bitboards indexed by player, plus the log of moves played '''
+    def __init__(self, dim=SIZE):
+        if dim == SIZE:
+            self.__moves, self.__flips = moves, flips
+        else:
+            g = geometry(dim) # raises ValueError for unsupported sizes
+            self.__moves, self.__flips = g.moves, g.flips
+        self.dim = dim
+        self.bits = [0, 0]
+        self.playLog = []
+        self.__last_move = None
+        self.setup()
+
+    def setup(self):
+        half = self.dim // 2
+        self.set_owner(half, half, WHITE)
+        self.set_owner(half + 1, half + 1, WHITE)
+        self.set_owner(half + 1, half, BLACK)
+        self.set_owner(half, half + 1, BLACK)
+
+    def copy(self):
+        board = Board(self.dim)
+        board.bits = self.bits.copy()
+        board.playLog = self.playLog.copy()
+        board.__last_move = self.__last_move
+        return board
+
+    ''' convert (1-based) engine coordinates to square index '''
+    def square(self, row, col):
+        return (col - 1) * self.dim + row - 1
+
+    def coords(self, sq):
+        return sq % self.dim + 1, sq // self.dim + 1
+
+    def owner(self, row, col):
+        mask = 1 << self.square(row, col)
+        for player in (WHITE, BLACK):
+            if self.bits[player] & mask:
+                return player
+        return NOBODY
+
+    def set_owner(self, row, col, player):
+        mask = 1 << self.square(row, col)
+        self.bits[WHITE] &= ~mask
+        self.bits[BLACK] &= ~mask
+        if player != NOBODY:
+            self.bits[player] |= mask
+
+    def last_move(self):
+        return self.__last_move
+
+    @property
+    def score(self):
+        return popcount(self.bits[WHITE]), popcount(self.bits[BLACK])
+
+    def get_valid_moves(self, player):
+        return self.__moves(self.bits[player], self.bits[player ^ 1])
+
+    def is_valid_move(self, player, row, col):
+        return bool(self.get_valid_moves(player) & (1 << self.square(row, col)))
+
+    ''' play on square sq, return the flipped discs; flipped, if given, skips recomputing them '''
+    def make(self, player, sq, flipped=None):
+        if flipped is None:
+            flipped = self.__flips(self.bits[player], self.bits[player ^ 1], sq)
+        self.bits[player] ^= flipped | (1 << sq)
+        self.bits[player ^ 1] ^= flipped
+        move = self.coords(sq)
+        self.playLog.append((player, move))
+        self.__last_move = move
+        return flipped
+
+    ''' take back make(player, sq) that flipped the given discs '''
+    def unmake(self, player, sq, flipped):
+        self.bits[player] ^= flipped | (1 << sq)
+        self.bits[player ^ 1] ^= flipped
+        self.playLog.pop()
+        self.__last_move = self.playLog[-1][1] if self.playLog else None
+
+    ''' animation trace of a move: [(row, col, previous owner)] '''
+    def trace(self, player, sq, flipped):
+        return [ self.coords(sq) + (NOBODY,) ] + [ self.coords(i) + (player ^ 1,) for i in squares(flipped) ]
+
+    ''' play move, return animation trace '''
+    def move(self, player, move):
+        sq = self.square(*move)
+        return self.trace(player, sq, self.make(player, sq))
+
+
+class Reversi:
+    def __init__(self, dim, notify, log):
+        self.dim = dim
+        self.notify = notify
+        self.log = log
+        self.lookAhead = 4 # fixed search depth, used when there is no time budget
+        self.time_budget = None # seconds per machine move
+        self.node_budget = None # midgame search nodes per machine move; with a time budget, whichever runs out first
+        self.endgame_empties = 14 # solve exactly from this many empty squares down
+        self.endgame_mode = EXACT_MODE
+        self.book = None
+        self.player = WHITE # machine plays WHITE, user moves first
+        self.cancelled = None # callable, polled by the machine's search; when it returns True the move is abandoned
+        # run_search(search_job, job, notify=) runs the machine's search elsewhere, e.g. WorkerProcessServer.run
+        self.run_search = None
+        self.__files = {} # kind (book, patterns, probcut) -> filename opened
+        self.__games = 0 # games started, so a search process knows when to start afresh
+        self.__search = None
+        self.__workers = 1
+        self.__pvs = False
+        self.__probcut = None
+        self.__evaluate = evaluate
+        self.__pondered = None # (P, O, best move, depth) searched on the user's time
+        # boards past 8x8 have their own search; book, endgame solver, patterns and pondering are 8x8 only
+        self.__large_search = LargeBoardSearch(geometry(dim)) if dim != SIZE else None
+        self.tt_size_mb = DEFAULT_SIZE_MB
+        self.new_game()
+
+    @staticmethod
+    def set_player_names(names):
+        PLAYER_NAMES[:] = names
+
+    ''' transposition table memory cap, in MB; setting it reallocates the table '''
+    @property
+    def tt_size_mb(self):
+        return self.tt.size_mb
+
+    @tt_size_mb.setter
+    def tt_size_mb(self, size_mb):
+        if getattr(self, 'tt', None) and self.tt.size_mb == size_mb:
+            return
+        self.tt = TranspositionTable(size_mb)
+        self.__endgame = EndgameSolver(tt=self.tt)
+        self.__new_search()
+
+    ''' apply the settings of LEVELS[level] '''
+    def set_level(self, level):
+        settings = dict(node_budget=None, time_budget=None)
+        settings.update(LEVELS[level])
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+    ''' number of processes for the midgame search; more than 1 splits the root moves across a pool '''
+    @property
+    def search_workers(self):
+        return self.__workers
+
+    @search_workers.setter
+    def search_workers(self, workers):
+        if workers != self.__workers:
+            self.__workers = workers
+            self.__new_search()
+
+    ''' principal variation search with aspiration windows instead of plain alpha-beta (8x8 midgame) '''
+    @property
+    def pvs(self):
+        return self.__pvs
+
+    @pvs.setter
+    def pvs(self, pvs):
+        self.__pvs = pvs
+        for search in (self.__search, self.__ponder_search, self.__analysis_search):
+            if search:
+                search.pvs = pvs
+
+    '''
+    Multi-ProbCut parameters of the midgame search, or None; they only
+    take effect while the evaluation is the one they were fitted with
+    '''
+    @property
+    def probcut(self):
+        return self.__probcut
+
+    @probcut.setter
+    def probcut(self, probcut):
+        if probcut is not self.__probcut:
+            self.__probcut = probcut
+            self.__new_search()
+
+    ''' static evaluation function of the midgame search, search.evaluate(P, O) by default '''
+    @property
+    def evaluate(self):
+        return self.__evaluate
+
+    @evaluate.setter
+    def evaluate(self, evaluate):
+        if evaluate is not self.__evaluate:
+            self.__evaluate = evaluate
+            self.tt.clear() # stored scores came from the old evaluation
+            self.__new_search()
+
+    def __new_search(self):
+        if isinstance(self.__search, ParallelSearch):
+            self.__search.close()
+        probcut = self.__probcut
+        if probcut and (not probcut.evaluation or probcut.evaluation != fingerprint(self.__evaluate)):
+            probcut = None
+        if self.__workers > 1:
+            self.__search = ParallelSearch(self.__workers, self.__evaluate, tt=self.tt, probcut=probcut)
+        else:
+            self.__search = Search(self.__evaluate, tt=self.tt)
+        self.__ponder_search = Search(self.__evaluate, tt=self.tt)
+        self.__analysis_search = None # made by the first analyze()
+        for search in (self.__search, self.__ponder_search):
+            search.pvs = self.__pvs
+            search.probcut = probcut
+
+    def close(self):
+        if isinstance(self.__search, ParallelSearch):
+            self.__search.close()
+        if self.book:
+            self.book.close()
+
+    def open_book(self, filename):
+        self.book = Book(filename)
+        self.__files['book'] = filename
+
+    ''' evaluate with pattern tables trained by tools/train_patterns.py '''
+    def open_patterns(self, filename):
+        self.evaluate = PatternEvaluator.load(filename)
+        self.__files['patterns'] = filename
+
+    ''' prune with Multi-ProbCut parameters fitted by tools/calibrate_probcut.py '''
+    def open_probcut(self, filename):
+        self.probcut = ProbCut.load(filename)
+        self.__files['probcut'] = filename
+
+    ''' open the files ({kind: filename}) that are not open yet '''
+    def open_files(self, files):
+        for kind, filename in files.items():
+            if self.__files.get(kind) != filename:
+                getattr(self, 'open_' + kind)(filename)
+
+    ''' the machine's move to search, as plain data for search_job '''
+    def search_job(self):
+        return {
+            'dim': self.dim,
+            'game': self.__games,
+            'black': self.board.bits[BLACK],
+            'white': self.board.bits[WHITE],
+            'player': self.player,
+            'settings': { name: getattr(self, name) for name in SEARCH_SETTINGS },
+            'files': dict(self.__files),
+        }
+
+    def new_game(self):
+        self.__games += 1
+        self.__pondered = None
+        self.tt.clear()
+        if isinstance(self.__search, ParallelSearch):
+            self.__search.new_game()
+        self.board = Board(self.dim)
+        self.turn = BLACK
+        # per-ply records (square, flipped discs, player, passed), passed if
+        # the turn was the other player's when the move was made
+        self.undo = []
+        self.redo = [] # undone records, the next one last
+
+    def state(self):
+        return self.board.bits[BLACK], self.board.bits[WHITE], self.turn
+
+    def is_new_game(self):
+        return not self.board.playLog
+
+    def can_move(self, player):
+        return self.board.get_valid_moves(player) != 0
+
+    def is_game_over(self):
+        return not self.can_move(self.turn) and not self.can_move(self.turn ^ 1)
+
+    def can_undo(self):
+        return any(self.__turn_before(record) != self.player for record in self.undo)
+
+    def can_redo(self):
+        return bool(self.redo)
+
+    @staticmethod
+    def __turn_before(record):
+        _, _, player, passed = record
+        return player ^ passed
+
+    def log_move(self, player, move):
+        self.log('{}: {}'.format(player_name(player), self.square_name(self.board.square(*move))))
+
+    def square_name(self, sq):
+        x, y = self.board.coords(sq)
+        return 'abcdefghijklmnop'[x - 1] + str(y)
+
+    def notify_cannot_move(self):
+        self.notify('cannot_move', self.turn)
+        self.turn ^= 1
+
+    def play_with_undo(self, player, move, undo=True, update=True):
+        sq = self.board.square(*move)
+        flipped = self.board.make(player, sq)
+        if undo:
+            self.undo.append((sq, flipped, player, int(self.turn != player)))
+            self.redo.clear()
+        self.turn = player ^ 1
+        self.log_move(player, move)
+        if update:
+            self.notify('update', self.board.trace(player, sq, flipped))
+
+    def do_user_move(self, row, col):
+        if self.turn == self.player or self.is_game_over():
+            return
+        if self.board.is_valid_move(self.turn, row, col):
+            self.play_with_undo(self.turn, (row, col))
+
+    def do_machine_move(self):
+        if self.is_game_over():
+            return
+        if not self.can_move(self.turn):
+            self.notify_cannot_move()
+        elif self.turn == self.player:
+            try:
+                move = self.search_best_move()
+            except SearchTimeout:
+                self.notify('cancelled')
+                return
+            self.play_with_undo(self.player, move)
+
+    '''
+    Post a search_stats message: where the move came from (book, endgame or
+    midgame), the depth being searched, nodes, nodes/sec, transposition
+    table hit rate, elapsed seconds, best move so far and its score, in
+    units ('discs', or 'eval' for the raw units of an evaluation that is
+    not scaled to discs, see __midgame_score); final is True for the last
+    message of a move.
+    '''
+    def __post_stats(self, source, depth, nodes, start, sq, score, final=True):
+        elapsed = perf_counter() - start
+        units = 'discs'
+        if source == 'midgame':
+            score, units = self.__midgame_score(score)
+        self.notify('search_stats', {
+            'ply': len(self.board.playLog),
+            'source': source,
+            'depth': depth,
+            'nodes': nodes,
+            'nps': nodes / elapsed if elapsed else 0,
+            'tt_hit_rate': self.tt.hit_rate,
+            'elapsed': elapsed,
+            'move': self.square_name(sq) if sq is not None else None,
+            'score': score,
+            'units': units,
+            'final': final,
+        })
+
+    '''
+    return (score, units) of a midgame search score: in discs if the
+    evaluation is (pattern tables), else in its own units, with won or
+    lost positions at DISC_VALUE per disc
+    '''
+    def __midgame_score(self, score):
+        if score is None:
+            return None, 'discs'
+        if getattr(self.evaluate, 'disc_scaled', False) and not self.__large_search:
+            return score / DISC_VALUE, 'discs'
+        return score, 'eval'
+
+    ''' return the coordinates of the machine's move; raise SearchTimeout, having posted no final stats, if cancelled() turns True meanwhile '''
+    def search_best_move(self):
+        if self.run_search:
+            return self.__run_search()
+        searches = [ s for s in (self.__search, self.__endgame, self.__large_search) if s ]
+        for search in searches:
+            search.stop = self.cancelled
+        for search in (self.__search, self.__large_search):
+            if search:
+                search.max_nodes = self.node_budget
+        try:
+            return self.__search_best_move()
+        finally:
+            for search in searches:
+                search.stop = None
+
+    ''' raise SearchTimeout if cancelled(): a time-limited search returns its best move so far, which is not to be posted '''
+    def __check_cancelled(self):
+        if self.cancelled and self.cancelled():
+            raise SearchTimeout
+
+    def __run_search(self):
+        ply = len(self.board.playLog)
+        def notify(msg, *args):
+            if msg == 'search_stats':
+                args[0]['ply'] = ply # the search process does not have the move log
+            self.notify(msg, *args)
+        sq = self.run_search(search_job, self.search_job(), notify=notify)
+        if sq is None:
+            raise SearchTimeout
+        return self.board.coords(sq)
+
+    def __search_best_move(self):
+        P, O = self.board.bits[self.player], self.board.bits[self.player ^ 1]
+        if self.__large_search:
+            return self.__search_large_board(P, O)
+        start = perf_counter()
+        self.tt.reset_stats()
+        if self.book:
+            hit = self.book.lookup(P, O)
+            if hit:
+                self.__post_stats('book', 0, 0, start, *hit)
+                return self.board.coords(hit[0])
+        empties = self.dim ** 2 - popcount(P | O)
+        if empties <= self.endgame_empties:
+            solver = self.__endgame
+            solver.deadline = start + ENDGAME_TIME_SHARE * self.time_budget if self.time_budget else None
+            try:
+                sq, score = solver.best_move(P, O, self.endgame_mode)
+                self.notify('search_depth', empties)
+                self.__post_stats('endgame', empties, solver.nodes, start, sq, score)
+                return self.board.coords(sq)
+            except SearchTimeout:
+                self.__check_cancelled() # else out of time: the midgame search plays, in what is left of the budget
+            finally:
+                solver.deadline = None
+        time_budget = self.time_budget and self.time_budget - (perf_counter() - start)
+        search = self.__search
+        start_depth, first = self.__ponder_hit(P, O)
+        current = [start_depth, first, None] # depth in progress, best move and score of the depth before
+        def on_depth(depth, sq, score):
+            current[:] = depth + 1, sq, score
+        last_post = [start]
+        def progress():
+            now = perf_counter()
+            if now - last_post[0] >= STATS_INTERVAL:
+                last_post[0] = now
+                self.__post_stats('midgame', current[0], search.nodes, start, *current[1:], final=False)
+        search.progress = progress
+        try:
+            if self.time_budget or self.node_budget:
+                sq, score, depth = search.iterative_deepening(P, O, time_budget, on_depth=on_depth, start_depth=start_depth, first=first)
+                self.__check_cancelled()
+                self.notify('search_depth', depth)
+            elif start_depth > self.lookAhead:
+                search.reset_stats() # already searched deep enough while pondering
+                sq, score, depth = first, None, start_depth - 1
+            else:
+                sq, score = search.best_move(P, O, self.lookAhead)
+                depth = self.lookAhead
+        finally:
+            search.progress = None
+        self.__check_cancelled()
+        self.__post_stats('midgame', depth, search.nodes, start, sq, score)
+        return self.board.coords(sq)
+
+    def __search_large_board(self, P, O):
+        search = self.__large_search
+        start = perf_counter()
+        if self.time_budget or self.node_budget:
+            sq, score, depth = search.iterative_deepening(P, O, self.time_budget)
+        else:
+            depth = self.lookAhead
+            sq, score = search.best_move(P, O, depth)
+        self.__check_cancelled()
+        self.notify('search_depth', depth)
+        self.__post_stats('midgame', depth, search.nodes, start, sq, score)
+        return self.board.coords(sq)
+
+    ''' return (depth to resume from, best move) if (P, O) was pondered, else (1, None) '''
+    def __ponder_hit(self, P, O):
+        pondered, self.__pondered = self.__pondered, None
+        if pondered and pondered[:2] == (P, O):
+            return pondered[3] + 1, pondered[2]
+        return 1, None
+
+    '''
+    Idle task: while the user is thinking, search the position after the reply
+    the search expects, until should_stop() returns True. If the user plays
+    that reply, the next search resumes from the pondered depth and best move,
+    with the transposition table already filled in; otherwise it is dropped.
+    '''
+    def ponder(self, should_stop):
+        if self.turn == self.player or self.is_game_over() or self.__large_search:
+            return
+        if self.node_budget:
+            return # a pondered table would make the budgeted search depend on the user's think time
+        H, M = self.board.bits[self.player ^ 1], self.board.bits[self.player]
+        search = self.__ponder_search
+        m = moves(H, M)
+        if not m:
+            return
+        entry = self.tt.probe(zobrist(H, M)[0])
+        predicted = entry[3] if entry and m >> entry[3] & 1 else search.best_move(H, M, 2)[0]
+        P, O = play(H, M, predicted)
+        if not moves(P, O) or self.dim ** 2 - popcount(P | O) <= self.endgame_empties:
+            return
+        if self.book and self.book.lookup(P, O):
+            return
+        start_depth, first = 1, None
+        if self.__pondered and self.__pondered[:2] == (P, O):
+            start_depth, first = self.__pondered[3] + 1, self.__pondered[2]
+        def on_depth(depth, sq, _):
+            self.__pondered = (P, O, sq, depth)
+        search.stop = should_stop
+        try:
+            search.iterative_deepening(P, O, None, on_depth=on_depth, start_depth=start_depth, first=first)
+        finally:
+            search.stop = None
+
+    '''
+    Score the moves of position (black, white, side to move; the current
+    one by default) to depth, or deepening until time_budget runs out:
+    all of them, or the best multipv. Posts an analysis message after each
+    completed depth, {ply, player, depth, units, lines, final}, lines being
+    [{move, score, pv}] best first, scores in units as in search_stats, pv
+    the expected line of play with 'pass' for passes; final is True for
+    the last message, which is also returned. 8x8 boards only.
+    '''
+    def analyze(self, position=None, depth=None, time_budget=None, multipv=None):
+        black, white, player = position or self.state()
+        bits = { BLACK: black, WHITE: white }
+        P, O = bits[player], bits[player ^ 1]
+        ply = popcount(black | white) - 4
+        def post(depth, lines, final):
+            analysis = {
+                'ply': ply,
+                'player': player,
+                'depth': depth,
+                'units': self.__midgame_score(0)[1],
+                'lines': [ {
+                    'move': self.square_name(sq),
+                    'score': self.__midgame_score(score)[0],
+                    'pv': [ 'pass' if i is None else self.square_name(i) for i in pv ],
+                } for sq, score, pv in lines ],
+                'final': final,
+            }
+            self.notify('analysis', analysis)
+            return analysis
+        if self.__large_search:
+            return post(0, [], True)
+        if depth is None and not time_budget:
+            depth = self.lookAhead
+        search = self.__analysis_search
+        if search is None:
+            # a table of its own, so that what the user analyzes leaves node-budget moves the same
+            search = self.__analysis_search = Search(self.__evaluate, TranspositionTable(self.tt_size_mb))
+            search.pvs, search.probcut = self.__pvs, self.__ponder_search.probcut
+        search.stop = self.cancelled
+        try:
+            lines, depth = search.analyze(P, O, time_budget, depth or MAX_DEPTH, multipv,
+                on_depth=lambda depth, lines: post(depth, lines, False))
+        finally:
+            search.stop = None
+        return post(depth, lines, True)
+
+    def replay_log(self, log):
+        self.new_game()
+        for player, move in log:
+            self.play_with_undo(player, tuple(move), update=False)
+        if not self.is_game_over() and not self.can_move(self.turn):
+            self.turn ^= 1
+
+    def __undo_move(self):
+        record = self.undo.pop()
+        sq, flipped, player, _ = record
+        self.board.unmake(player, sq, flipped)
+        self.turn = self.__turn_before(record)
+        self.redo.append(record)
+
+    ''' replay the next undone move; return False if there is none '''
+    def redo_move(self, update=True):
+        if not self.redo:
+            return False
+        record = self.redo.pop()
+        sq, flipped, player, _ = record
+        self.board.make(player, sq, flipped)
+        self.undo.append(record)
+        self.turn = player ^ 1
+        if update:
+            self.notify('update', self.board.trace(player, sq, flipped))
+        return True
+
+    ''' undo or redo moves until ply moves have been played '''
+    def seek(self, ply):
+        while len(self.undo) > ply:
+            self.__undo_move()
+        while len(self.undo) < ply and self.redo_move(update=False):
+            pass
+
+    ''' take back the machine's replies and the user's last move '''
+    def undo_turn(self):
+        while self.undo:
+            self.__undo_move()
+            if self.turn != self.player:
+                break
+
+    ''' replay what undo_turn took back '''
+    def redo_turn(self):
+        self.redo_move(update=False)
+        while self.redo and self.__turn_before(self.redo[-1]) == self.player:
+            self.redo_move(update=False)
+
+    def switch(self):
+        self.player ^= 1
+        self.notify('ready')
+
+
+_job_engine, _job_game = None, None # of the search process
+
+
+'''
+Search the machine's move of a Reversi.search_job() in a search process,
+keeping the engine (and its transposition table) from one job to the
+next; return the square, or None if cancelled() turned True.
+'''
+def search_job(job, notify, cancelled):
+    global _job_engine, _job_game
+    engine = _job_engine
+    if engine is None or engine.dim != job['dim']:
+        engine = _job_engine = Reversi(job['dim'], notify, lambda _: None)
+        _job_game = None
+    engine.notify = notify
+    engine.cancelled = cancelled
+    for name, value in job['settings'].items():
+        setattr(engine, name, value)
+    engine.open_files(job['files'])
+    if _job_game != job['game']:
+        _job_game = job['game']
+        engine.new_game()
+    engine.board.bits[BLACK], engine.board.bits[WHITE] = job['black'], job['white']
+    engine.turn = engine.player = job['player']
+    try:
+        return engine.board.square(*engine.search_best_move())
+    except SearchTimeout:
+        return None
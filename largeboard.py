@@ -0,0 +1,223 @@
+'''
+Boards past 8x8 (10x10 up to 16x16): Python big-int bitboards with the
+direction masks precomputed per size, and an alpha-beta search for them.
+
+Square index is row * dim + col, as on the 8x8 board; shifts by 1, dim,
+dim - 1 and dim + 1 walk the four axes, and the edge masks stop the
+flood fill from wrapping around. The 8x8 engine (bitboard, search, tt,
+endgame, book, patterns) is specialised for 64-bit words and stays the
+fast path for the standard board.
+'''
+from functools import lru_cache
+from time import perf_counter
+
+from bitboard import SIZE, popcount, squares
+from search import CLOCK_CHECK_MASK, DISC_VALUE, INFINITY, MAX_DEPTH, MOBILITY_WEIGHT, SearchTimeout
+from tt import EXACT, LOWER, UPPER
+
+MAX_SIZE = 16
+TABLE_ENTRIES = 1 << 18 # the position table is dropped when it grows past this
+
+
+class Geometry:
+    ''' masks and move generation for a dim x dim board '''
+    def __init__(self, dim):
+        if dim % 2 or not SIZE <= dim <= MAX_SIZE:
+            raise ValueError('unsupported board size: {}'.format(dim))
+        n = dim * dim
+        self.dim = dim
+        self.full = (1 << n) - 1
+        row = (1 << dim) - 1
+        col = sum(1 << (r * dim) for r in range(dim))
+        border = row | (row << (n - dim)) | col | (col << (dim - 1))
+        not_edge_cols = self.full & ~(col | (col << (dim - 1)))
+        not_edge_rows = self.full & ~(row | (row << (n - dim)))
+        not_edge = not_edge_cols & not_edge_rows
+        self.directions = ((1, not_edge_cols), (dim, not_edge_rows), (dim - 1, not_edge), (dim + 1, not_edge))
+        self.fill_steps = dim - 3 # runs of opponent discs are at most dim - 2 long
+
+        # square classes for the static evaluation, as in search.WEIGHTS
+        corners = [ (0, 0), (0, dim - 1), (dim - 1, 0), (dim - 1, dim - 1) ]
+        def mask(cells):
+            return sum(1 << (r * dim + c) for r, c in cells)
+        def near(r, c, diagonal):
+            dr, dc = (1 if r == 0 else -1), (1 if c == 0 else -1)
+            return [ (r + dr, c + dc) ] if diagonal else [ (r + dr, c), (r, c + dc) ]
+        self.corners = mask(corners)
+        x_squares = mask(sum((near(r, c, True) for r, c in corners), []))
+        c_squares = mask(sum((near(r, c, False) for r, c in corners), []))
+        self.weights = (
+            (self.corners, 25),
+            (x_squares, -12),
+            (c_squares, -4),
+            (border & ~(self.corners | c_squares), 2),
+        )
+
+    def moves(self, P, O):
+        ''' legal moves for P, as a bitmask '''
+        empty = ~(P | O) & self.full
+        m = 0
+        steps = range(self.fill_steps)
+        for s, mask in self.directions:
+            o = O & mask
+            t = o & (P << s)
+            for _ in steps:
+                t |= o & (t << s)
+            m |= t << s
+
+            t = o & (P >> s)
+            for _ in steps:
+                t |= o & (t >> s)
+            m |= t >> s
+        return m & empty
+
+    def flips(self, P, O, sq):
+        ''' discs flipped when P plays on square sq '''
+        f = 0
+        x = 1 << sq
+        for s, mask in self.directions:
+            o = O & mask
+
+            t = 0
+            y = x << s
+            while y & o:
+                t |= y
+                y <<= s
+            if y & P:
+                f |= t
+
+            t = 0
+            y = x >> s
+            while y & o:
+                t |= y
+                y >>= s
+            if y & P:
+                f |= t
+        return f
+
+    def final_margin(self, P, O):
+        ''' disc margin of a finished game for P, empty squares go to the winner '''
+        p, o = popcount(P), popcount(O)
+        if p > o:
+            return self.dim ** 2 - 2 * o
+        if p < o:
+            return 2 * p - self.dim ** 2
+        return 0
+
+    def evaluate(self, P, O):
+        ''' static evaluation of the position, for the side to move '''
+        score = 0
+        for mask, weight in self.weights:
+            score += weight * (popcount(P & mask) - popcount(O & mask))
+        score += MOBILITY_WEIGHT * (popcount(self.moves(P, O)) - popcount(self.moves(O, P)))
+        return score
+
+
+@lru_cache(maxsize=None)
+def geometry(dim):
+    return Geometry(dim)
+
+
+class LargeBoardSearch:
+    '''
+    Negamax alpha-beta with iterative deepening, the counterpart of
+    search.Search for big-int boards: a dict keyed by (P, O) stands in
+    for the Zobrist-hashed table, and moves are ordered table move first,
+    then corners.
+    '''
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.table = {} # (P, O) -> (depth, bound, score, move)
+        self.deadline = None
+        self.stop = None
+        self.max_nodes = None
+        self.progress = None
+        self.nodes = 0
+        self.depth = 0
+
+    def out_of_time(self):
+        return (self.deadline and perf_counter() > self.deadline) or (self.stop and self.stop()) or \
+            (self.max_nodes and self.nodes >= self.max_nodes)
+
+    def negamax(self, P, O, depth, alpha, beta):
+        self.nodes += 1
+        if not self.nodes & CLOCK_CHECK_MASK or self.nodes == self.max_nodes:
+            if self.progress:
+                self.progress()
+            if (self.deadline or self.stop or self.max_nodes) and self.out_of_time():
+                raise SearchTimeout
+        g = self.geometry
+        if depth <= 0:
+            return g.evaluate(P, O)
+        m = g.moves(P, O)
+        if not m:
+            if not g.moves(O, P):
+                return DISC_VALUE * g.final_margin(P, O)
+            return -self.negamax(O, P, depth, -beta, -alpha)
+        entry = self.table.get((P, O))
+        tt_move = None
+        if entry:
+            tt_depth, bound, score, tt_move = entry
+            if tt_depth >= depth:
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+        best = None
+        for sq in self.order(m, tt_move):
+            f = g.flips(P, O, sq)
+            score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -beta, -alpha)
+            if score > alpha:
+                alpha, best = score, sq
+                if alpha >= beta:
+                    break
+        if len(self.table) >= TABLE_ENTRIES:
+            self.table.clear()
+        self.table[(P, O)] = (depth, LOWER if alpha >= beta else EXACT if best is not None else UPPER, alpha, best)
+        return alpha
+
+    def order(self, m, first=None):
+        order = []
+        if first is not None and m >> first & 1:
+            order.append(first)
+            m ^= 1 << first
+        corners = m & self.geometry.corners
+        return order + list(squares(corners)) + list(squares(m ^ corners))
+
+    def root(self, P, O, depth, first=None):
+        g = self.geometry
+        best, alpha = None, -INFINITY
+        for sq in self.order(g.moves(P, O), first):
+            f = g.flips(P, O, sq)
+            score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -INFINITY, -alpha)
+            if score > alpha:
+                best, alpha = sq, score
+        if best is not None:
+            self.table[(P, O)] = (depth, EXACT, alpha, best)
+        self.depth = depth
+        return best, alpha
+
+    ''' return (square, score) of the best move for P, or (None, score) if P must pass '''
+    def best_move(self, P, O, depth):
+        self.nodes = 0
+        return self.root(P, O, depth)
+
+    ''' as search.Search.iterative_deepening; return (square, score, depth) '''
+    def iterative_deepening(self, P, O, time_budget, max_depth=MAX_DEPTH, on_depth=None):
+        self.nodes = 0
+        self.deadline = None if time_budget is None else perf_counter() + time_budget
+        m = self.geometry.moves(P, O)
+        best, score, depth = next(squares(m), None), 0, 0
+        if popcount(m) < 2:
+            self.deadline = None
+            return best, score, depth
+        max_depth = min(max_depth, popcount(~(P | O) & self.geometry.full))
+        try:
+            for d in range(1, max_depth + 1):
+                best, score = self.root(P, O, d, first=best)
+                depth = d
+                if on_depth:
+                    on_depth(depth, best, score)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best, score, depth
@@ -1,4 +1,6 @@
-from reversi_app import main
+import multiprocessing
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # in a frozen build, the worker and search processes start here too
+    from reversi_app import main
     main()
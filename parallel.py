@@ -0,0 +1,135 @@
+'''
+Root-splitting parallel search on a process pool.
+
+The first root move is searched in the calling process (young brothers
+wait at the root); its score becomes the shared alpha bound and the
+remaining root moves are handed to the workers. Each worker reads the
+best alpha found so far when it starts a move, and publishes its own
+score when it improves on it. Narrowed (aspiration) windows, which
+principal variation search uses from the third depth on, are searched
+serially, so with pvs most of the work stays in the calling process.
+
+Workers search with a window one point below alpha, so moves that tie
+with the best score are still resolved exactly, and the result is
+picked the way the serial search picks it: the first move, in search
+order, with the highest score.
+'''
+from concurrent.futures import ProcessPoolExecutor, wait
+from time import perf_counter
+import multiprocessing
+
+from bitboard import flips
+from search import INFINITY, Search, SearchTimeout, evaluate
+from tt import EXACT, TranspositionTable, zobrist, zobrist_play
+
+MIN_SPLIT_DEPTH = 3 # shallower searches are not worth the round trips
+STOP_POLL_INTERVAL = .01 # seconds between polls of stop() while the workers search
+WORKER_TT_MB = 8
+
+# worker process state
+_search = None
+_shared = None # [search generation, best alpha]
+_searching = None # (game, search) of the last move searched, see ParallelSearch.new_search
+
+
+def _init_worker(shared, tt_size_mb, evaluate, probcut):
+    global _search, _shared
+    _search = Search(evaluate, TranspositionTable(tt_size_mb))
+    _search.probcut = probcut
+    _shared = shared
+
+
+''' search root move sq of search (game number, search number); return (sq, score, nodes) '''
+def _search_move(generation, searching, P, O, sq, depth, alpha, time_left):
+    global _searching
+    if searching != _searching:
+        if _searching is None or searching[0] != _searching[0]:
+            _search.tt.clear() # a new game
+        _search.new_search()
+        _searching = searching
+    with _shared.get_lock():
+        if _shared[0] == generation:
+            alpha = max(alpha, _shared[1])
+    search = _search
+    search.nodes = 0
+    search.deadline = None if time_left is None else perf_counter() + time_left
+    search.stop = lambda: _shared[0] != generation # the root search moved on, or was stopped
+    k, ks = zobrist(P, O)
+    f = flips(P, O, sq)
+    k2, ks2 = zobrist_play(k, ks, f, sq)
+    try:
+        score = -search.negamax(O ^ f, P | f | (1 << sq), depth - 1, -INFINITY, 1 - alpha, k2, ks2)
+    finally:
+        search.deadline = search.stop = None
+    with _shared.get_lock():
+        if _shared[0] == generation and score > _shared[1]:
+            _shared[1] = score
+    return sq, score, search.nodes
+
+
+class ParallelSearch(Search):
+    ''' probcut is fixed for the lifetime of the pool, it is handed to the workers as they start '''
+    def __init__(self, workers, evaluate=evaluate, tt=None, worker_tt_mb=WORKER_TT_MB, probcut=None):
+        super().__init__(evaluate, tt)
+        self.probcut = probcut
+        self.workers = workers
+        self.__generation = 0
+        self.__searching = (0, 0) # the workers start afresh when it changes
+        self.__shared = multiprocessing.Array('q', 2)
+        self.__pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.__shared, worker_tt_mb, evaluate, probcut))
+
+    def close(self):
+        self.__pool.shutdown()
+
+    ''' as Search.new_search, in the workers too (as they get their next move) '''
+    def new_search(self):
+        super().new_search()
+        game, search = self.__searching
+        self.__searching = (game, search + 1)
+
+    ''' the workers clear their transposition tables before their next move '''
+    def new_game(self):
+        game, search = self.__searching
+        self.__searching = (game + 1, search)
+
+    ''' as Search.root; narrowed (aspiration) windows are searched serially '''
+    def root(self, P, O, depth, first=None, alpha=-INFINITY, beta=INFINITY):
+        k, ks = zobrist(P, O)
+        order = self.root_moves(P, O, k, first)
+        if depth < MIN_SPLIT_DEPTH or len(order) < 2 or alpha > -INFINITY or beta < INFINITY:
+            return super().root(P, O, depth, first, alpha, beta)
+
+        best = order[0]
+        f = flips(P, O, best)
+        alpha = -self.negamax(O ^ f, P | f | (1 << best), depth - 1, -INFINITY, INFINITY, *zobrist_play(k, ks, f, best))
+
+        self.__generation += 1
+        with self.__shared.get_lock():
+            self.__shared[0], self.__shared[1] = self.__generation, alpha
+        time_left = None if self.deadline is None else self.deadline - perf_counter()
+        futures = [ self.__pool.submit(_search_move, self.__generation, self.__searching, P, O, sq, depth, alpha, time_left) for sq in order[1:] ]
+        scores = {}
+        try:
+            pending = futures
+            while pending:
+                done, pending = wait(pending, STOP_POLL_INTERVAL)
+                for future in done:
+                    sq, score, nodes = future.result()
+                    scores[sq] = score
+                    self.nodes += nodes
+                if pending and self.out_of_time():
+                    raise SearchTimeout
+        except SearchTimeout:
+            self.__generation += 1 # stops the workers still searching
+            with self.__shared.get_lock():
+                self.__shared[0] = self.__generation
+            for future in futures:
+                future.cancel()
+            raise
+
+        for sq in order[1:]:
+            if scores[sq] > alpha:
+                best, alpha = sq, scores[sq]
+        self.tt.store(k, depth, EXACT, alpha, best)
+        self.depth = depth
+        return best, alpha
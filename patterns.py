@@ -0,0 +1,170 @@
+'''
+Pattern-table evaluation.
+
+Each pattern is a list of squares; its instances are the distinct images
+of that list under the 8 board symmetries, and all instances of a
+pattern share one table. The table index of an instance is the base-3
+number whose i-th digit is 0, 1 or 2 for an empty, own or opponent disc
+on its i-th square. Weights are int16, one set of tables per game phase,
+in hundredths of a disc of final margin for the side to move.
+
+At run time an instance index is not built square by square: the board
+is viewed in a few orientations (as is, transposed and pseudo-rotated by
+45 degrees both ways, which lines up diagonals), each instance is read
+from the orientation where it spans the fewest rows, and each row it
+spans contributes through a 256-entry table indexed by that row's byte.
+'''
+from array import array
+import struct
+import sys
+import zlib
+
+from bitboard import FULL, SYMMETRIES, popcount, transpose
+from search import DISC_VALUE
+
+# digit order matters: it is the order of the squares in the table index
+PATTERNS = (
+    ('edge+2x', [0, 1, 2, 3, 4, 5, 6, 7, 9, 14]),
+    ('corner3x3', [0, 1, 2, 8, 9, 10, 16, 17, 18]),
+    ('corner2x5', [0, 1, 2, 3, 4, 8, 9, 10, 11, 12]),
+    ('line2', [8, 9, 10, 11, 12, 13, 14, 15]),
+    ('line3', [16, 17, 18, 19, 20, 21, 22, 23]),
+    ('line4', [24, 25, 26, 27, 28, 29, 30, 31]),
+    ('diag8', [0, 9, 18, 27, 36, 45, 54, 63]),
+    ('diag7', [1, 10, 19, 28, 37, 46, 55]),
+    ('diag6', [2, 11, 20, 29, 38, 47]),
+    ('diag5', [3, 12, 21, 30, 39]),
+    ('diag4', [4, 13, 22, 31]),
+    ('bias', []), # per-phase constant
+)
+PHASES = 12
+MAGIC = b'RVPT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI') # magic, version, phases, weights per phase
+WEIGHT_SCALE = 100 # table units per disc
+
+
+def phase(P, O):
+    return min(PHASES - 1, (popcount(P | O) - 4) * PHASES // 60)
+
+
+def instances(squares):
+    ''' distinct images of a square list under the board symmetries '''
+    seen, result = set(), []
+    for transform, _ in SYMMETRIES:
+        image = [ transform(1 << sq).bit_length() - 1 for sq in squares ]
+        if frozenset(image) not in seen:
+            seen.add(frozenset(image))
+            result.append(image)
+    return result
+
+
+''' [(name, table offset, table size, instances)] '''
+def layout():
+    offset, result = 0, []
+    for name, squares in PATTERNS:
+        size = 3 ** len(squares)
+        result.append((name, offset, size, instances(squares) if squares else [[]]))
+        offset += size
+    return result, offset
+
+
+def instance_index(P, O, squares):
+    ''' reference index computation, square by square '''
+    return sum(3 ** i * ((P >> sq & 1) + 2 * (O >> sq & 1)) for i, sq in enumerate(squares))
+
+
+def _rotr(b, n):
+    return ((b >> n) | (b << (64 - n))) & FULL
+
+
+def pseudo_rotate45(b, k1=0xAAAAAAAAAAAAAAAA, k2=0xCCCCCCCCCCCCCCCC, k4=0xF0F0F0F0F0F0F0F0):
+    b ^= k1 & (b ^ _rotr(b, 8))
+    b ^= k2 & (b ^ _rotr(b, 16))
+    b ^= k4 & (b ^ _rotr(b, 32))
+    return b
+
+
+def pseudo_rotate45_anti(b):
+    return pseudo_rotate45(b, 0x5555555555555555, 0x3333333333333333, 0x0F0F0F0F0F0F0F0F)
+
+# the order of the byte blocks built by PatternEvaluator.__call__
+ORIENTATIONS = (lambda b: b, transpose, pseudo_rotate45, pseudo_rotate45_anti)
+
+
+def _compile(squares):
+    '''
+    Return [(byte position, table for own discs, table for opponent discs)]
+    in the orientation where squares span the fewest rows; the byte position
+    indexes the concatenated little-endian bytes of all the orientations.
+    '''
+    best = None
+    for o, transform in enumerate(ORIENTATIONS):
+        rows = {}
+        for digit, sq in enumerate(squares):
+            pos = transform(1 << sq).bit_length() - 1
+            rows.setdefault(8 * o + (pos >> 3), []).append((pos & 7, 3 ** digit))
+        if best is None or len(rows) < len(best):
+            best = rows
+    parts = []
+    for byte, bits in sorted(best.items()):
+        table = [ sum(weight for bit, weight in bits if b >> bit & 1) for b in range(256) ]
+        parts.append((byte, table, [ 2 * x for x in table ]))
+    return tuple(parts)
+
+
+class WeightsError(Exception):
+    pass
+
+
+def load_weights(filename):
+    ''' return a list of array('h'), one per phase '''
+    _, size = layout()
+    with open(filename, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise WeightsError('{}: truncated header'.format(filename))
+        magic, version, phases, per_phase = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or phases != PHASES or per_phase != size:
+            raise WeightsError('{}: incompatible pattern weights'.format(filename))
+        weights = []
+        for _ in range(phases):
+            w = array('h')
+            try:
+                w.fromfile(f, per_phase)
+            except EOFError:
+                raise WeightsError('{}: truncated'.format(filename))
+            if sys.byteorder == 'big':
+                w.byteswap() # stored little-endian
+            weights.append(w)
+    return weights
+
+
+class PatternEvaluator:
+    ''' static evaluation from pattern tables, callable as search.evaluate(P, O) '''
+    disc_scaled = True # DISC_VALUE per disc of predicted final margin
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.fingerprint = zlib.crc32(b''.join(w.tobytes() for w in weights)) # see probcut.fingerprint
+        self.instances = []
+        for _, offset, _, group in layout()[0]:
+            for squares in group:
+                self.instances.append((offset, _compile(squares)))
+
+    @staticmethod
+    def load(filename):
+        return PatternEvaluator(load_weights(filename))
+
+    def __call__(self, P, O):
+        p = P.to_bytes(8, 'little') + transpose(P).to_bytes(8, 'little') + \
+            pseudo_rotate45(P).to_bytes(8, 'little') + pseudo_rotate45_anti(P).to_bytes(8, 'little')
+        o = O.to_bytes(8, 'little') + transpose(O).to_bytes(8, 'little') + \
+            pseudo_rotate45(O).to_bytes(8, 'little') + pseudo_rotate45_anti(O).to_bytes(8, 'little')
+        w = self.weights[phase(P, O)]
+        score = 0
+        for index, parts in self.instances:
+            for byte, own, opp in parts:
+                index += own[p[byte]] + opp[o[byte]]
+            score += w[index]
+        return score * DISC_VALUE // WEIGHT_SCALE
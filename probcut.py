@@ -0,0 +1,92 @@
+'''
+Multi-ProbCut parameters.
+
+A shallow search predicts the deep one: for each (deep, shallow) depth
+pair and game phase, v_deep ~ a * v_shallow + b with residual standard
+deviation sigma, fitted by tools/calibrate_probcut.py. At a node
+searched to a calibrated depth, a null-window shallow search at
+(beta + t * sigma - b) / a that fails high predicts that the deep search
+fails high with the confidence of t standard deviations, and the node is
+cut; likewise below alpha. Each deep depth is checked against all its
+shallow depths, the cheapest first.
+
+Parameters are in the units of the evaluation they were fitted with, so
+the file records which evaluation that was (see fingerprint).
+'''
+import struct
+
+from bitboard import popcount
+
+PHASES = 4
+THRESHOLD = 1.5 # t, standard deviations of confidence needed to cut
+MAGIC = b'RVPC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHI') # magic, version, phases, depth pairs, evaluation fingerprint
+PAIR = struct.Struct('<HH') # deep, shallow depth
+FIT = struct.Struct('<fff') # a, b, sigma; one per phase after each pair
+
+
+def phase(P, O):
+    return min(PHASES - 1, (popcount(P | O) - 4) * PHASES // 60)
+
+
+def shallow_depths(depth):
+    ''' shallow depths to predict depth from: same parity, at most half as deep '''
+    return list(range(2 - depth % 2, depth // 2 + 1, 2))
+
+
+def fingerprint(evaluate):
+    ''' identifies an evaluation function by a checksum of its weights (search.evaluate, pattern tables); 0 if unknown '''
+    return getattr(evaluate, 'fingerprint', 0)
+
+
+class ProbCutError(Exception):
+    pass
+
+
+class ProbCut:
+    ''' params: {(deep, shallow): [(a, b, sigma)] * PHASES} '''
+    def __init__(self, params, evaluation=0, threshold=THRESHOLD):
+        self.params = params
+        self.evaluation = evaluation
+        # by deep depth and phase: [(shallow, a, b, t * sigma)], shallowest first
+        self.__checks = {}
+        for (deep, shallow), fits in sorted(params.items()):
+            if len(fits) != PHASES:
+                raise ProbCutError('depth pair {}/{}: {} phases'.format(deep, shallow, len(fits)))
+            by_phase = self.__checks.setdefault(deep, [ [] for _ in range(PHASES) ])
+            for i, (a, b, sigma) in enumerate(fits):
+                if a > 0:
+                    by_phase[i].append((shallow, a, b, threshold * sigma))
+        self.min_depth = min(self.__checks, default=0)
+
+    def checks(self, P, O, depth):
+        by_phase = self.__checks.get(depth)
+        return by_phase[phase(P, O)] if by_phase else ()
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ProbCutError('{}: truncated header'.format(filename))
+        magic, version, phases, pairs, evaluation = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or phases != PHASES:
+            raise ProbCutError('{}: incompatible ProbCut parameters'.format(filename))
+        if len(data) != HEADER.size + pairs * (PAIR.size + phases * FIT.size):
+            raise ProbCutError('{}: truncated'.format(filename))
+        params, offset = {}, HEADER.size
+        for _ in range(pairs):
+            pair = PAIR.unpack_from(data, offset)
+            offset += PAIR.size
+            params[pair] = [ FIT.unpack_from(data, offset + i * FIT.size) for i in range(phases) ]
+            offset += phases * FIT.size
+        return ProbCut(params, evaluation)
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, PHASES, len(self.params), self.evaluation))
+            for pair, fits in sorted(self.params.items()):
+                f.write(PAIR.pack(*pair))
+                for fit in fits:
+                    f.write(FIT.pack(*fit))
@@ -18,13 +18,12 @@ from kivy.uix.dropdown import DropDown
 from kivy.uix.gridlayout import GridLayout
 from kivy.storage.dictstore import DictStore
 
-from GameLogic import int_to_bits
 from collections import deque
-from controller import Controller
+from controller import Controller, int_to_bits
 from msgbox import MessageBox
 from utils import is_mobile
 
-from os import path, walk
+from os import environ, path, walk
 import json
 import sys
 
@@ -261,12 +260,16 @@ class BoardWidget(Widget):
 
 class ReversiApp(App):
     icon = ThemeManager.icon()
-    __events__ = ( 'on_cannot_move', 'on_game_over', 'on_ready', 'on_update', )
+    __events__ = ( 'on_analysis', 'on_cancelled', 'on_cannot_move', 'on_error', 'on_game_over', 'on_ready', 'on_search_depth', 'on_search_stats', 'on_update', )
 
-    def __init__(self, dim=8):
+    def __init__(self, dim=8, show_search_stats=None, stats_log=None, backend='thread', probcut=False):
         super().__init__()
         log_callback = Logger.trace if is_mobile() else Logger.info
-        self.__controller = Controller(dim, self.__dispatch, Clock.schedule_once, log_callback)
+        self.__controller = Controller(dim, self.__dispatch, Clock.schedule_once, log_callback,
+            book=path.join(DATA_DIR, 'book.bin'), patterns=path.join(DATA_DIR, 'patterns.bin'),
+            probcut=path.join(DATA_DIR, 'probcut.bin') if probcut else None, stats_log=stats_log, level=Controller.default_level(),
+            backend=backend)
+        self.show_search_stats = not is_mobile() if show_search_stats is None else show_search_stats
 
         self.btns = {
             'new': Button(text='New', on_press=self.new_game, disabled=True),
@@ -278,7 +281,10 @@ class ReversiApp(App):
         self.board = BoardWidget(self.__controller, log_callback)
         self.bind(on_cannot_move=self.board.on_cannot_move)
         self.bind(on_update=self.board.on_update)
-        self.update_events = Clock.schedule_interval(self.__controller.dispatch_messages, 0)
+        # dispatch on the frame after a message is posted, rather than polling every frame
+        self.update_events = Clock.create_trigger(self.__controller.dispatch_messages)
+        self.__controller.add_message_listener(self.update_events)
+        self.update_events() # for what was posted while starting up
         self.store = DictStore('reversi.data')
         self.load_game()
         self.title = self.board.theme.title
@@ -304,6 +310,9 @@ class ReversiApp(App):
         self.dropdown = DropDown()
         hbox.add_widget(Button(text='Theme', on_release=self.dropdown.open, font_size=20))
         self.build_theme_selection()
+        self.level_dropdown = DropDown()
+        hbox.add_widget(Button(text='Level', on_release=self.level_dropdown.open, font_size=20))
+        self.build_level_selection()
         return layout
 
     def build_theme_selection(self):
@@ -318,6 +327,22 @@ class ReversiApp(App):
 
         self.dropdown.bind(on_select=self.select_theme)
 
+    def build_level_selection(self):
+        for level in Controller.levels():
+            btn = ToggleButton(text=level, width=80, height=65, size_hint_y=None, group='level', font_size=14)
+            btn.bind(on_release=self.level_dropdown.select)
+            self.level_dropdown.add_widget(btn)
+            if level == self.__controller.level:
+                btn.state = 'down'
+
+        self.level_dropdown.bind(on_select=self.select_level)
+
+    def select_level(self, _, btn):
+        btn.state = 'down'
+        if btn.text != self.__controller.level:
+            self.__controller.set_level(btn.text)
+            self.save_game()
+
     def select_theme(self, _, btn):
         if btn.text == self.board.theme.name:
             btn.state = 'down'
@@ -327,13 +352,16 @@ class ReversiApp(App):
             self.board.once = 1
             self.dispatch('on_update')
 
-    # Ctrl+z or Android back button
+    # Ctrl+z or Android back button, Ctrl+y
     def key_handler(self, window, keycode1, keycode2, text, modifiers):
         # self.board.log('modifers: {} {}'.format(modifiers, type(modifiers)))
         undo = keycode1 in [27, 1001] if is_mobile() else (keycode1==122 and 'ctrl' in modifiers)
         if undo:
             self.undo()
             return True
+        elif keycode1==121 and 'ctrl' in modifiers:
+            self.redo()
+            return True
         elif keycode1==27:
             return True # don't close on Escape
 
@@ -344,13 +372,29 @@ class ReversiApp(App):
         if not self.board.current_animation:
             self.board.message_box(title='Confirm', text=text + '?', on_close=callback)
 
+    def on_analysis(self, analysis, request_id):
+        pass
+
+    def on_cancelled(self):
+        self.info.text = self.__controller.status_info()
+
     def on_cannot_move(self, who):
         pass
 
+    def on_error(self, error, request_id):
+        self.info.text = self.__controller.status_info()
+
     def on_game_over(self, *score):
         self.info.text = self.__controller.status_info()
         self.board.message_box('Game Over', Controller.format_score(score))
 
+    def on_search_depth(self, depth):
+        pass
+
+    def on_search_stats(self, stats):
+        if self.show_search_stats:
+            self.info.text = '{} {}'.format(self.__controller.status_info(), Controller.format_search_stats(stats))
+
     def on_quit(self, _, source=None):
         self.save_game()
         self.__controller.quit()
@@ -394,6 +438,10 @@ class ReversiApp(App):
 
         if self.__controller.state['can_undo']:
             self.confirm('Undo last move', undo_last)
+
+    def redo(self, *_):
+        if self.__controller.state['can_redo']:
+            self.__controller.redo()
     
     def __dispatch(self, msg, args=()):
         self.board.log('dispatch: {} {}'.format(msg, args))
@@ -405,14 +453,18 @@ class ReversiApp(App):
             data = self.store.get(DATA_DIR)
             self.__controller.game_data = data.get('game', [])
             self.board.theme = ThemeManager.load(data.get('theme'))
+            self.__controller.set_level(data.get('level', Controller.default_level()))
             self.__controller.update_state()
             self.on_ready()
 
     def save_game(self):
         self.board.log('reversi: save')
-        self.store.put(DATA_DIR, game = self.__controller.game_data, theme=self.board.theme.name)
+        self.store.put(DATA_DIR, game = self.__controller.game_data, theme=self.board.theme.name, level=self.__controller.level)
 
 
 def main():
-    app = ReversiApp(8)
+    dim = int(environ.get('REVERSI_BOARD_SIZE', 8)) # even, 8 to 16
+    app = ReversiApp(dim, stats_log=environ.get('REVERSI_STATS_LOG'), # JSON lines, one per machine move
+        backend=environ.get('REVERSI_WORKER', 'thread'), # 'process' to search in a child process
+        probcut=environ.get('REVERSI_PROBCUT') == '1') # opt-in until tools/tournament.py shows it keeps the strength
     app.run()
@@ -0,0 +1,371 @@
+from itertools import chain
+from time import perf_counter
+import zlib
+from bitboard import CORNERS, FULL, final_margin, flips, moves, popcount, squares
+from tt import EXACT, LOWER, UPPER, NO_MOVE, TranspositionTable, zobrist, zobrist_play
+
+INFINITY = 1 << 30
+DISC_VALUE = 1000 # final disc margin, scaled well above any static evaluation
+MAX_DEPTH = 60
+CLOCK_CHECK_MASK = 1023 # look at the clock every 1024 nodes
+
+# nodes at least this deep order their moves by a reduced-depth search
+SHALLOW_ORDER_DEPTH = 4
+SHALLOW_ORDER_REDUCTION = 3
+
+# initial half-width of the aspiration window around the previous
+# iteration's score, at least the change between the last two iterations
+ASPIRATION_WINDOW = 16
+
+# square classes for the static evaluation, from the point of view of
+# the side to move: (mask, weight)
+X_SQUARES = 0x0042000000004200
+C_SQUARES = 0x4281000000008142
+EDGES = 0x3C0081818181003C
+WEIGHTS = (
+    (CORNERS, 25),
+    (X_SQUARES, -12),
+    (C_SQUARES, -4),
+    (EDGES, 2),
+)
+MOBILITY_WEIGHT = 3
+
+
+def evaluate(P, O):
+    ''' static evaluation of the position, for the side to move '''
+    score = 0
+    for mask, weight in WEIGHTS:
+        score += weight * (popcount(P & mask) - popcount(O & mask))
+    score += MOBILITY_WEIGHT * (popcount(moves(P, O)) - popcount(moves(O, P)))
+    return score
+
+evaluate.fingerprint = zlib.crc32(repr((WEIGHTS, MOBILITY_WEIGHT)).encode()) # see probcut.fingerprint
+
+
+def final_score(P, O):
+    return DISC_VALUE * final_margin(P, O)
+
+
+class SearchTimeout(Exception):
+    ''' out of time, or stopped from outside the search '''
+    pass
+
+
+class Search:
+    '''
+    Negamax alpha-beta, fixed-depth or iterative deepening under a time budget,
+    backed by a transposition table that outlives individual searches.
+    '''
+    def __init__(self, evaluate=evaluate, tt=None):
+        self.evaluate = evaluate
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.ordering = True # killer, history and shallow-search move ordering
+        self.pvs = False # principal variation search: null windows after the first move, aspiration windows
+        self.probcut = None # probcut.ProbCut: prune where shallow searches predict the deep result
+        self.killers = [ [NO_MOVE, NO_MOVE] for _ in range(MAX_DEPTH + 1) ] # by remaining depth
+        self.history = [0] * 64
+        self.deadline = None
+        self.stop = None # callable, polled with the clock; the search ends when it returns True
+        self.max_nodes = None # node budget: the same search stops at the same node anywhere
+        self.progress = None # callable, polled with the clock, e.g. to report statistics
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.cutoffs = 0 # beta cutoffs
+        self.first_cutoffs = 0 # beta cutoffs by the first move tried
+        self.probcut_cuts = 0 # nodes pruned by ProbCut
+        self.depth = 0 # last completed root depth
+
+    ''' forget the ordering statistics of the previous search, but keep some history '''
+    def new_search(self):
+        self.reset_stats()
+        self.tt.new_search()
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        self.history = [ h >> 2 for h in self.history ]
+
+    ''' effective branching factor b, such that nodes = b ** depth '''
+    @property
+    def branching_factor(self):
+        return self.nodes ** (1 / self.depth) if self.depth else 0
+
+    def stats(self):
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'first_cutoff_rate': self.first_cutoffs / self.cutoffs if self.cutoffs else 0,
+            'branching_factor': self.branching_factor,
+        }
+
+    def out_of_time(self):
+        return (self.deadline and perf_counter() > self.deadline) or (self.stop and self.stop()) or \
+            (self.max_nodes and self.nodes >= self.max_nodes)
+
+    ''' k, ks: zobrist keys of (P, O) and (O, P) '''
+    def negamax(self, P, O, depth, alpha, beta, k, ks):
+        self.nodes += 1
+        if not self.nodes & CLOCK_CHECK_MASK or self.nodes == self.max_nodes:
+            if self.progress:
+                self.progress()
+            if (self.deadline or self.stop or self.max_nodes) and self.out_of_time():
+                raise SearchTimeout
+        if depth <= 0:
+            return self.evaluate(P, O)
+        m = moves(P, O)
+        if not m:
+            if not moves(O, P):
+                return final_score(P, O)
+            return -self.negamax(O, P, depth, -beta, -alpha, ks, k) # pass
+        tt = self.tt
+        entry = tt.probe(k)
+        tt_move = NO_MOVE
+        if entry:
+            tt_depth, bound, score, tt_move = entry
+            if tt_depth >= depth:
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+        if self.probcut and depth >= self.probcut.min_depth:
+            score = self.probcut_cut(P, O, depth, alpha, beta, k, ks)
+            if score is not None:
+                self.probcut_cuts += 1
+                return score
+        if self.ordering:
+            order = self.order_moves(P, O, m, depth, tt_move, k, ks)
+        elif m >> tt_move & 1:
+            order = chain((tt_move,), squares(m ^ (1 << tt_move)))
+        else:
+            order = squares(m)
+        best = NO_MOVE
+        first = True
+        for sq in order:
+            f = flips(P, O, sq)
+            k2, ks2 = zobrist_play(k, ks, f, sq)
+            if self.pvs and not first:
+                # prove the move is no better than alpha; search it properly only if it is
+                score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -alpha - 1, -alpha, k2, ks2)
+                if alpha < score < beta:
+                    score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -beta, -alpha, k2, ks2)
+            else:
+                score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -beta, -alpha, k2, ks2)
+            if score > alpha:
+                alpha, best = score, sq
+                if alpha >= beta:
+                    self.cutoffs += 1
+                    self.first_cutoffs += first
+                    killers = self.killers[depth]
+                    if killers[0] != sq:
+                        killers[0], killers[1] = sq, killers[0]
+                    self.history[sq] += depth * depth
+                    break
+            first = False
+        tt.store(k, depth, LOWER if alpha >= beta else EXACT if best != NO_MOVE else UPPER, alpha, best)
+        return alpha
+
+    ''' Multi-ProbCut: beta or alpha if a shallow search predicts the deep one fails high or low, else None '''
+    def probcut_cut(self, P, O, depth, alpha, beta, k, ks):
+        for shallow, a, b, margin in self.probcut.checks(P, O, depth):
+            if beta < INFINITY:
+                bound = int((beta + margin - b) / a) + 1
+                if self.negamax(P, O, shallow, bound - 1, bound, k, ks) >= bound:
+                    return beta
+            if alpha > -INFINITY:
+                bound = int((alpha - margin - b) / a) - 1
+                if self.negamax(P, O, shallow, bound, bound + 1, k, ks) <= bound:
+                    return alpha
+        return None
+
+    '''
+    Order the moves in m: the table's move, then (deep in the tree) by a
+    reduced-depth search, or (near the leaves) killers and then history.
+    '''
+    def order_moves(self, P, O, m, depth, tt_move, k, ks):
+        if depth >= SHALLOW_ORDER_DEPTH:
+            scored = []
+            for sq in squares(m):
+                if sq == tt_move:
+                    scored.append((-INFINITY - 1, sq))
+                    continue
+                f = flips(P, O, sq)
+                k2, ks2 = zobrist_play(k, ks, f, sq)
+                scored.append((self.negamax(O ^ f, P | f | (1 << sq), depth - 1 - SHALLOW_ORDER_REDUCTION, -INFINITY, INFINITY, k2, ks2), sq))
+            scored.sort()
+            return [ sq for _, sq in scored ]
+        order = []
+        for sq in (tt_move,) + tuple(self.killers[depth]):
+            if m >> sq & 1:
+                order.append(sq)
+                m ^= 1 << sq
+        history = self.history
+        return order + sorted(squares(m), key=history.__getitem__, reverse=True)
+
+    ''' root moves in search order: the first square (or the table's best move) ahead of the others '''
+    def root_moves(self, P, O, k, first=None):
+        m = moves(P, O)
+        if first is None:
+            entry = self.tt.probe(k)
+            first = entry[3] if entry else None
+        order = list(squares(m))
+        if first is not None and m >> first & 1:
+            order.remove(first)
+            order.insert(0, first)
+        return order
+
+    '''
+    Search the root moves within (alpha, beta); return (best move, score).
+    The move is None if all moves fail low, and the score is then an upper bound.
+    '''
+    def root(self, P, O, depth, first=None, alpha=-INFINITY, beta=INFINITY):
+        k, ks = zobrist(P, O)
+        alpha0, best = alpha, None
+        for sq in self.root_moves(P, O, k, first):
+            f = flips(P, O, sq)
+            k2, ks2 = zobrist_play(k, ks, f, sq)
+            if self.pvs and best is not None:
+                score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -alpha - 1, -alpha, k2, ks2)
+                if alpha < score < beta:
+                    score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -beta, -alpha, k2, ks2)
+            else:
+                score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -beta, -alpha, k2, ks2)
+            if score > alpha:
+                best, alpha = sq, score
+                if alpha >= beta:
+                    break
+        if best is not None:
+            self.tt.store(k, depth, LOWER if alpha >= beta else EXACT, alpha, best)
+        elif alpha0 > -INFINITY:
+            self.tt.store(k, depth, UPPER, alpha)
+        self.depth = depth
+        return best, alpha
+
+    '''
+    Search to depth in an aspiration window around the previous score,
+    widening it (twice as much each time) on a fail-low or fail-high.
+    '''
+    def aspiration(self, P, O, depth, first, previous, delta):
+        alpha, beta = max(previous - delta, -INFINITY), min(previous + delta, INFINITY)
+        while True:
+            best, score = self.root(P, O, depth, first, alpha, beta)
+            if score <= alpha and alpha > -INFINITY:
+                delta *= 2
+                alpha = max(score - delta, -INFINITY)
+            elif score >= beta and beta < INFINITY:
+                first = best
+                delta *= 2
+                beta = min(score + delta, INFINITY)
+            else:
+                return best, score
+
+    ''' return (square, score) of the best move for P, or (None, score) if P must pass '''
+    def best_move(self, P, O, depth):
+        self.new_search()
+        return self.root(P, O, depth)
+
+    '''
+    Deepen one ply at a time until time_budget (seconds, None for no limit)
+    or max_nodes runs out or the search is stopped, keeping the result of the last completed
+    depth; the previous best move is searched first. A search can be resumed
+    from start_depth with the best move of the depth before it.
+    on_depth(depth, square, score) is called after each completed iteration.
+    Return (square, score, depth).
+    '''
+    def iterative_deepening(self, P, O, time_budget, max_depth=MAX_DEPTH, on_depth=None, start_depth=1, first=None):
+        self.new_search()
+        self.deadline = None if time_budget is None else perf_counter() + time_budget
+        m = moves(P, O)
+        best, score, depth = first if first is not None else next(squares(m), None), 0, start_depth - 1
+        if popcount(m) < 2:
+            self.deadline = None
+            return best, score, depth
+        max_depth = min(max_depth, popcount(~(P | O) & FULL))
+        scores = [] # of the completed iterations
+        try:
+            for d in range(start_depth, max_depth + 1):
+                if self.pvs and len(scores) >= 2:
+                    delta = max(ASPIRATION_WINDOW, abs(scores[-1] - scores[-2]))
+                    best, score = self.aspiration(P, O, d, best, scores[-1], delta)
+                else:
+                    best, score = self.root(P, O, d, first=best)
+                scores.append(score)
+                depth = d
+                if on_depth:
+                    on_depth(depth, best, score)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return best, score, depth
+
+    '''
+    Score the root moves, searched in the given order, to depth: every
+    move exactly, or with multipv=k only the k best exactly (the others are
+    just shown to be no better than the k-th). Return [(square, score)] of
+    the exactly scored moves, best first.
+    '''
+    def root_multipv(self, P, O, depth, order, multipv=None):
+        k, ks = zobrist(P, O)
+        scored = []
+        for sq in order:
+            f = flips(P, O, sq)
+            k2, ks2 = zobrist_play(k, ks, f, sq)
+            if multipv and len(scored) >= multipv:
+                bound = scored[multipv - 1][1]
+                if -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -bound - 1, -bound, k2, ks2) <= bound:
+                    continue
+            score = -self.negamax(O ^ f, P | f | (1 << sq), depth - 1, -INFINITY, INFINITY, k2, ks2)
+            scored.append((sq, score))
+            scored.sort(key=lambda i: -i[1]) # stable: ties keep search order
+        if scored:
+            self.tt.store(k, depth, EXACT, scored[0][1], scored[0][0])
+        self.depth = depth
+        return scored[:multipv] if multipv else scored
+
+    ''' the line of play from P's move sq, following the table's best moves; None for a pass '''
+    def principal_variation(self, P, O, sq, length):
+        pv = [ sq ]
+        f = flips(P, O, sq)
+        P, O = O ^ f, P | f | (1 << sq)
+        while len(pv) < length:
+            m = moves(P, O)
+            if not m:
+                if not moves(O, P) or pv[-1] is None:
+                    break
+                pv.append(None)
+                P, O = O, P
+                continue
+            entry = self.tt.probe(zobrist(P, O)[0])
+            if not entry or not m >> entry[3] & 1:
+                break
+            sq = entry[3]
+            f = flips(P, O, sq)
+            pv.append(sq)
+            P, O = O ^ f, P | f | (1 << sq)
+        return pv
+
+    '''
+    Multi-PV analysis: deepen one ply at a time, to max_depth or until
+    time_budget runs out, scoring every root move (or the best multipv of
+    them), each iteration searching the moves in the order of the one
+    before. on_depth(depth, lines) is called after each completed
+    iteration. Return (lines, depth) of the last one, lines being
+    [(square, score, principal variation)] best first.
+    '''
+    def analyze(self, P, O, time_budget=None, max_depth=MAX_DEPTH, multipv=None, on_depth=None):
+        self.new_search()
+        self.deadline = None if time_budget is None else perf_counter() + time_budget
+        order = self.root_moves(P, O, zobrist(P, O)[0])
+        lines, depth = [], 0
+        try:
+            for d in range(1, min(max_depth, popcount(~(P | O) & FULL)) + 1):
+                scored = self.root_multipv(P, O, d, order, multipv)
+                lines = [ (sq, score, self.principal_variation(P, O, sq, d)) for sq, score in scored ]
+                depth = d
+                searched = [ sq for sq, _ in scored ]
+                order = searched + [ sq for sq in order if sq not in searched ]
+                if on_depth:
+                    on_depth(depth, lines)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        return lines, depth
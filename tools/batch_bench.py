@@ -0,0 +1,88 @@
+'''
+Batch move generator benchmark and cross-check: plays many random games
+side by side with the vectorised primitives of batch.py, and at every
+ply compares legal-move masks, flips, the resulting position and disc
+counts with the scalar bitboard functions the engine uses, reporting
+throughput for both.
+
+    python tools/batch_bench.py [--games 10000] [--seed 0]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import batch
+import bitboard
+from bitboard import START_BLACK, START_WHITE
+
+
+def random_squares(m, rng):
+    ''' pick one set bit of each (non-zero) mask in m uniformly, as square indices '''
+    rank = (rng.random(len(m)) * batch.popcount(m)).astype(np.int64)
+    for _ in range(int(rank.max(initial=0))):
+        skip = rank > 0
+        m = np.where(skip, m & (m - np.uint64(1)), m)
+        rank -= skip
+    low = m & (~m + np.uint64(1))
+    return np.log2(low.astype(np.float64)).astype(np.int64) # exact for powers of 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    P = np.full(args.games, START_BLACK, np.uint64)
+    O = np.full(args.games, START_WHITE, np.uint64)
+    active = np.ones(args.games, bool)
+    positions = mismatches = 0
+    batch_time = scalar_time = 0
+    while True:
+        m = batch.moves(P, O)
+        passing = m == 0
+        P, O = np.where(passing, O, P), np.where(passing, P, O)
+        m = np.where(passing, batch.moves(P, O), m)
+        active &= m != 0
+        idx = np.flatnonzero(active)
+        if not len(idx):
+            break
+        P1, O1 = P[idx], O[idx]
+        sq = random_squares(m[idx], rng)
+
+        start = perf_counter()
+        m1 = batch.moves(P1, O1)
+        f1 = batch.flips(P1, O1, sq)
+        P2, O2 = batch.play(P1, O1, sq)
+        c1 = batch.counts(P2, O2)
+        batch_time += perf_counter() - start
+
+        start = perf_counter()
+        expected = []
+        for p, o, s in zip(P1.tolist(), O1.tolist(), sq.tolist()):
+            after = bitboard.play(p, o, s)
+            expected.append((bitboard.moves(p, o), bitboard.flips(p, o, s), after, bitboard.popcount(after[0]), bitboard.popcount(after[1])))
+        scalar_time += perf_counter() - start
+
+        got = zip(m1.tolist(), f1.tolist(), P2.tolist(), O2.tolist(), c1[0].tolist(), c1[1].tolist())
+        for (em, ef, (ep, eo), ecp, eco), (gm, gf, gp, go, gcp, gco) in zip(expected, got):
+            if (em, ef, ep, eo, ecp, eco) != (gm, gf, gp, go, gcp, gco):
+                mismatches += 1
+        positions += len(idx)
+        P[idx], O[idx] = P2, O2
+
+    print('{} games, {} positions, {} mismatches'.format(args.games, positions, mismatches))
+    print('batch:  {:8.3f}s {:10.0f} positions/s'.format(batch_time, positions / batch_time))
+    print('scalar: {:8.3f}s {:10.0f} positions/s'.format(scalar_time, positions / scalar_time))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
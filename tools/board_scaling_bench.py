@@ -0,0 +1,92 @@
+'''
+Board size scaling benchmark: for each board size, times move generation
+(legal-move masks plus the flips of every legal move) over random
+mid-game positions, and a fixed-depth search of the same positions. The
+8x8 row is run twice: with the big-int code used for larger boards and
+with the 64-bit engine (bitboard.py and search.Search) for comparison.
+
+    python tools/board_scaling_bench.py [--sizes 8 10 12 14 16] [--depth 3]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import random
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+import bitboard
+from bitboard import popcount, squares
+from largeboard import LargeBoardSearch, geometry
+from search import Search
+
+
+def random_positions(g, count, fill, rng):
+    ''' count positions with about fill of the board covered, from random play '''
+    dim = g.dim
+    half = dim // 2
+    positions = []
+    while len(positions) < count:
+        P = (1 << ((half - 1) * dim + half)) | (1 << (half * dim + half - 1))
+        O = (1 << ((half - 1) * dim + half - 1)) | (1 << (half * dim + half))
+        while popcount(P | O) < fill * dim * dim:
+            m = g.moves(P, O)
+            if not m:
+                if not g.moves(O, P):
+                    break
+                P, O = O, P
+                continue
+            sq = rng.choice(list(squares(m)))
+            f = g.flips(P, O, sq)
+            P, O = O ^ f, P | f | (1 << sq)
+        if g.moves(P, O):
+            positions.append((P, O))
+    return positions
+
+
+def bench_movegen(moves, flips, positions, repeat):
+    start = perf_counter()
+    count = 0
+    for _ in range(repeat):
+        for P, O in positions:
+            m = moves(P, O)
+            for sq in squares(m):
+                flips(P, O, sq)
+            count += 1
+    return count / (perf_counter() - start)
+
+
+def bench_search(search, positions, depth):
+    nodes, start = 0, perf_counter()
+    for P, O in positions:
+        search.best_move(P, O, depth)
+        nodes += search.nodes
+    return perf_counter() - start, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 10, 12, 14, 16])
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--fill', type=float, default=.4, help='fraction of the board covered')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=10, help='move generation passes over the positions')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print('{:>6} {:>8} {:>14} {:>10} {:>12} {:>12}'.format('size', 'code', 'movegen pos/s', 'search s', 'nodes', 'nodes/s'))
+    for dim in args.sizes:
+        g = geometry(dim)
+        positions = random_positions(g, args.positions, args.fill, random.Random(args.seed))
+        runs = [ ('big-int', g.moves, g.flips, LargeBoardSearch(g)) ]
+        if dim == bitboard.SIZE:
+            runs.append(('64-bit', bitboard.moves, bitboard.flips, Search()))
+        for name, moves, flips, search in runs:
+            rate = bench_movegen(moves, flips, positions, args.repeat)
+            seconds, nodes = bench_search(search, positions, args.depth)
+            print('{:>6} {:>8} {:14.0f} {:10.3f} {:12} {:12.0f}'.format(
+                '{0}x{0}'.format(dim), name, rate, seconds, nodes, nodes / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+'''
+Build an opening book from engine self-play or from a game collection.
+
+    python tools/build_book.py selfplay --games 1000 --depth 4 -o data/book.bin
+    python tools/build_book.py import games.txt -o data/book.bin
+
+Imported games are transcripts, one per line, e.g. f5d6c3d3c4f4...;
+anything after the first whitespace on a line is ignored.
+'''
+from os import path
+from time import perf_counter
+import argparse
+import random
+import re
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from bitboard import FULL, START_BLACK, START_WHITE, final_margin, moves, parse_square, play, popcount, squares
+from book import BookBuilder, replay
+from endgame import EndgameSolver
+from search import Search
+
+
+def self_play(games, depth, random_plies, endgame_empties, seed):
+    ''' yield the squares played in each game '''
+    rng = random.Random(seed)
+    search, solver = Search(), EndgameSolver()
+    for _ in range(games):
+        P, O = START_BLACK, START_WHITE
+        played = []
+        while True:
+            m = moves(P, O)
+            if not m:
+                if not moves(O, P):
+                    break
+                P, O = O, P
+                continue
+            if len(played) < random_plies:
+                sq = rng.choice(list(squares(m)))
+            elif popcount(~(P | O) & FULL) <= endgame_empties:
+                sq, _ = solver.best_move(P, O)
+            else:
+                sq, _ = search.best_move(P, O, depth)
+            played.append(sq)
+            P, O = play(P, O, sq)
+        yield played
+
+
+def read_games(filename):
+    with open(filename) as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                yield [ parse_square(i) for i in re.findall('[a-hA-H][1-8]', fields[0]) ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', choices=('selfplay', 'import'))
+    parser.add_argument('files', nargs='*', help='game collections to import')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--games', type=int, default=1000, help='self-play games')
+    parser.add_argument('--depth', type=int, default=4, help='self-play search depth')
+    parser.add_argument('--random-plies', type=int, default=8, help='random opening moves in self-play')
+    parser.add_argument('--endgame-empties', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-ply', type=int, default=20, help='deepest book position')
+    parser.add_argument('--min-games', type=int, default=2, help='minimum games through a book position')
+    args = parser.parse_args()
+
+    if args.source == 'selfplay':
+        games = self_play(args.games, args.depth, args.random_plies, args.endgame_empties, args.seed)
+    else:
+        games = (game for filename in args.files for game in read_games(filename))
+
+    start = perf_counter()
+    builder = BookBuilder(args.max_ply, args.min_games)
+    count = 0
+    for played in games:
+        game, final = replay(played, START_BLACK, START_WHITE)
+        builder.add_game(game, final_margin(*final))
+        count += 1
+    records = builder.write(args.output)
+    print('{}: {} positions from {} games in {:.1f}s'.format(args.output, records, count, perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
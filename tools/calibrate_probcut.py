@@ -0,0 +1,112 @@
+'''
+Fit the Multi-ProbCut parameters (probcut.py) from a position corpus and
+write the file the engine loads from data/probcut.bin.
+
+    python tools/calibrate_probcut.py --positions 400 --max-depth 8 -o data/probcut.bin
+    python tools/calibrate_probcut.py positions.obf ... --patterns data/patterns.bin -o data/probcut.bin
+
+Each position is searched with plain alpha-beta to every depth up to
+--max-depth; for each (deep, shallow) depth pair and game phase,
+v_deep = a * v_shallow + b is fitted by least squares, and sigma is the
+standard deviation of the residuals. Phases with fewer than
+--min-samples positions get the fit over all phases. The parameters
+only apply with the evaluation they were fitted with, so fit with the
+same --patterns the engine plays with.
+'''
+from math import sqrt
+from os import path
+from time import perf_counter
+import argparse
+import random
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from positions import benchmark_positions, random_position
+
+from bitboard import FULL, moves, popcount
+from patterns import PatternEvaluator
+from probcut import PHASES, ProbCut, fingerprint, phase, shallow_depths
+from search import Search, evaluate
+from tt import TranspositionTable
+
+
+def corpus(files, count, min_empties, max_empties, seed):
+    ''' positions from the OBF files, or count random ones with empties spread over the range '''
+    if files:
+        return [ pos for pos in benchmark_positions(files, count) if moves(*pos) ]
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        pos = random_position(rng.randint(min_empties, max_empties), rng)
+        if pos:
+            positions.append(pos)
+    return positions
+
+
+def linear_fit(samples):
+    ''' least squares y = a * x + b over [(x, y)]; return (a, b, sigma) '''
+    n = len(samples)
+    mx = sum(x for x, _ in samples) / n
+    my = sum(y for _, y in samples) / n
+    sxx = sum((x - mx) ** 2 for x, _ in samples)
+    sxy = sum((x - mx) * (y - my) for x, y in samples)
+    a = sxy / sxx if sxx else 1.0
+    b = my - a * mx
+    sigma = sqrt(sum((y - a * x - b) ** 2 for x, y in samples) / n)
+    return a, b, sigma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='OBF files (default: seeded random positions)')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--positions', type=int, default=400)
+    parser.add_argument('--min-empties', type=int, default=16)
+    parser.add_argument('--max-empties', type=int, default=54)
+    parser.add_argument('--max-depth', type=int, default=8, help='deepest depth to predict')
+    parser.add_argument('--min-samples', type=int, default=30, help='fewer in a phase: use the fit over all phases')
+    parser.add_argument('--patterns', help='pattern weights the engine evaluates with')
+    parser.add_argument('--tt-mb', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    evaluator = PatternEvaluator.load(args.patterns) if args.patterns else evaluate
+    search = Search(evaluator, TranspositionTable(args.tt_mb))
+    positions = corpus(args.files, args.positions, args.min_empties, args.max_empties, args.seed)
+    pairs = [ (deep, shallow) for deep in range(3, args.max_depth + 1) for shallow in shallow_depths(deep) ]
+    samples = { pair: [ [] for _ in range(PHASES) ] for pair in pairs }
+
+    start = perf_counter()
+    for i, (P, O) in enumerate(positions):
+        search.tt.clear()
+        search.new_search()
+        empties = popcount(~(P | O) & FULL)
+        values = {}
+        for depth in range(1, min(args.max_depth, empties) + 1):
+            values[depth] = search.root(P, O, depth)[1]
+        for deep, shallow in pairs:
+            if deep in values:
+                samples[deep, shallow][phase(P, O)].append((values[shallow], values[deep]))
+        if (i + 1) % 50 == 0:
+            print('{} positions, {:.0f}s'.format(i + 1, perf_counter() - start), flush=True)
+
+    params = {}
+    print('{:>5} {:>7} {:>5} {:>7} {:>8} {:>8} {:>8}'.format('deep', 'shallow', 'phase', 'samples', 'a', 'b', 'sigma'))
+    for pair in pairs:
+        pooled = sum(samples[pair], [])
+        if len(pooled) < 2:
+            continue
+        overall = linear_fit(pooled)
+        fits = []
+        for i, phase_samples in enumerate(samples[pair]):
+            fit = linear_fit(phase_samples) if len(phase_samples) >= args.min_samples else overall
+            fits.append(fit)
+            print('{:>5} {:>7} {:>5} {:>7} {:8.3f} {:8.1f} {:8.1f}'.format(*pair, i, len(phase_samples), *fit))
+        params[pair] = fits
+    ProbCut(params, fingerprint(evaluator)).save(args.output)
+    print('wrote', args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''
+Endgame solver benchmark on OBF test positions, e.g. the FFO endgame
+suite (fforum-20-39.obf, fforum-40-59.obf as distributed with Edax):
+
+    python tools/ffo_bench.py fforum-40-59.obf [--wld] [--max-empties 24]
+
+Prints one line per position and checks the solver's score against the
+best score recorded in the file.
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from obf import read_obf
+
+from bitboard import FULL, popcount, square_name
+from endgame import EXACT_MODE, WLD_MODE, EndgameSolver
+from tt import TranspositionTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--wld', action='store_true', help='win/loss/draw search instead of exact margin')
+    parser.add_argument('--max-empties', type=int, default=64, help='skip positions with more empty squares')
+    parser.add_argument('--tt-mb', type=int, default=64, help='transposition table size')
+    args = parser.parse_args()
+
+    mode = WLD_MODE if args.wld else EXACT_MODE
+    total_nodes, total_time, failed = 0, 0, 0
+    print('{:>4} {:>7} {:>4} {:>6} {:>8} {:>12} {:>9} {:>9}'.format('#', 'empties', 'move', 'score', 'expected', 'nodes', 'time', 'nodes/s'))
+    n = 0
+    for filename in args.files:
+        for P, O, scores, _ in read_obf(filename):
+            empties = popcount(~(P | O) & FULL)
+            if empties > args.max_empties:
+                continue
+            n += 1
+            solver = EndgameSolver(TranspositionTable(args.tt_mb))
+            start = perf_counter()
+            sq, score = solver.best_move(P, O, mode)
+            elapsed = perf_counter() - start
+            expected = max(scores.values()) if scores else None
+            if expected is not None and mode == WLD_MODE:
+                expected = (expected > 0) - (expected < 0)
+            if expected is not None and expected != score:
+                failed += 1
+            total_nodes += solver.nodes
+            total_time += elapsed
+            print('{:>4} {:>7} {:>4} {:>+6} {:>8} {:>12} {:>9.2f} {:>9.0f}'.format(
+                n, empties, square_name(sq), score, '' if expected is None else '{:+}'.format(expected),
+                solver.nodes, elapsed, solver.nodes / max(elapsed, 1e-9)))
+    print('total: {} positions, {} nodes, {:.2f}s, {:.0f} nodes/s, {} wrong'.format(
+        n, total_nodes, total_time, total_nodes / max(total_time, 1e-9), failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,76 @@
+'''
+UI frame time benchmark: a stand-in for the Kivy main loop (a fixed slice
+of Python work per frame, at 60 frames per second) runs while the worker
+searches the machine's move, with the thread backend (the search shares
+the GIL with the loop) and the process backend (worker.WorkerProcessServer),
+and for reference with no search at all. Reports frame time percentiles
+and the share of frames that miss their slot by half a frame or more.
+
+    python tools/frame_bench.py [--seconds 5] [--frame-work 0.002]
+'''
+from os import path
+from time import perf_counter, sleep
+import argparse
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from engine import Reversi
+from worker import WorkerProcessServer, WorkerThreadServer
+
+FRAME = 1 / 60
+
+
+def frames(seconds, work):
+    ''' run the stand-in loop for seconds; return the frame times '''
+    times = []
+    start = last = perf_counter()
+    while last - start < seconds:
+        busy = perf_counter() + work
+        n = 0
+        while perf_counter() < busy:
+            n += 1 # layout and canvas updates
+        wake = last + FRAME
+        sleep(max(0, wake - perf_counter()))
+        now = perf_counter()
+        times.append(now - last)
+        last = now
+    return times
+
+
+def run(backend, seconds, work):
+    if backend is None:
+        return frames(seconds, work)
+    worker = WorkerProcessServer() if backend == 'process' else WorkerThreadServer()
+    game = Reversi(8, worker.post, lambda _: None)
+    game.cancelled = worker.is_cancelled
+    if backend == 'process':
+        game.run_search = worker.run
+    game.time_budget = seconds + 5 # still searching when the frames are done
+    game.player = game.turn
+    worker.send_message(game.do_machine_move)
+    sleep(.5) # let the search get going
+    times = frames(seconds, work)
+    worker.cancel()
+    while worker.read_message()[0] != 'cancelled':
+        pass
+    worker.stop()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--frame-work', type=float, default=.002, help='seconds of Python work per frame')
+    args = parser.parse_args()
+
+    print('{:>8} {:>7} {:>9} {:>9} {:>9} {:>8}'.format('search', 'frames', 'mean ms', 'p95 ms', 'max ms', 'late %'))
+    for backend in (None, 'thread', 'process'):
+        times = sorted(run(backend, args.seconds, args.frame_work))
+        late = sum(t >= 1.5 * FRAME for t in times)
+        print('{:>8} {:7} {:9.1f} {:9.1f} {:9.1f} {:8.1f}'.format(backend or 'none', len(times),
+            1000 * sum(times) / len(times), 1000 * times[int(.95 * (len(times) - 1))], 1000 * times[-1], 100 * late / len(times)))
+
+
+if __name__ == '__main__':
+    main()
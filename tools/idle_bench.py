@@ -0,0 +1,105 @@
+'''
+Idle dispatch benchmark: a stand-in for the Kivy clock (frames at 60 per
+second, with Clock.schedule_interval and Clock.create_trigger semantics)
+drains a worker's messages the way Controller.dispatch_messages does,
+either polling on every frame or only on the frame after the worker posts
+(worker.WorkerThreadServer.add_listener). Runs once with the engine idle
+and once while it plays machine moves, and reports the CPU time used and
+the number of dispatch calls per second.
+
+    python tools/idle_bench.py [--seconds 5]
+'''
+from os import path
+from time import perf_counter, process_time, sleep
+import argparse
+import sys
+import threading
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from engine import Reversi
+from worker import WorkerThreadServer
+
+FRAME = 1 / 60
+
+
+class Clock:
+    ''' frames at 60 per second, running interval callbacks and pending triggers '''
+    def __init__(self):
+        self.__intervals = []
+        self.__triggered = set()
+        self.__lock = threading.Lock()
+
+    def schedule_interval(self, callback):
+        self.__intervals.append(callback)
+
+    def create_trigger(self, callback):
+        def trigger(*_):
+            with self.__lock:
+                self.__triggered.add(callback)
+        return trigger
+
+    def run(self, seconds):
+        start = last = perf_counter()
+        while last - start < seconds:
+            with self.__lock:
+                triggered, self.__triggered = self.__triggered, set()
+            for callback in self.__intervals + list(triggered):
+                callback()
+            sleep(max(0, last + FRAME - perf_counter()))
+            last = perf_counter()
+
+
+def run(mode, busy, seconds):
+    worker = WorkerThreadServer()
+    game = Reversi(8, worker.post, lambda _: None)
+    game.cancelled = worker.is_cancelled
+    game.time_budget = .2
+    calls = messages = 0
+
+    def dispatch(*_):
+        nonlocal calls, messages
+        calls += 1
+        for msg, args, _ in worker.messages():
+            messages += 1
+            if busy and msg in ('update', 'cannot_move'):
+                worker.send_message(play)
+
+    def play():
+        ''' the machine plays both sides, game after game '''
+        if game.is_game_over():
+            game.new_game()
+        game.player = game.turn
+        game.do_machine_move()
+
+    clock = Clock()
+    if mode == 'poll':
+        clock.schedule_interval(dispatch)
+    else:
+        trigger = clock.create_trigger(dispatch)
+        worker.add_listener(trigger)
+    if busy:
+        worker.send_message(play)
+    start = process_time()
+    clock.run(seconds)
+    cpu = process_time() - start
+    worker.cancel()
+    worker.stop()
+    return cpu, calls, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print('{:>8} {:>8} {:>10} {:>11} {:>11}'.format('engine', 'mode', 'cpu %', 'calls/s', 'messages/s'))
+    for busy in (False, True):
+        for mode in ('poll', 'trigger'):
+            cpu, calls, messages = run(mode, busy, args.seconds)
+            print('{:>8} {:>8} {:10.2f} {:11.1f} {:11.1f}'.format('busy' if busy else 'idle', mode,
+                100 * cpu / args.seconds, calls / args.seconds, messages / args.seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Difficulty level benchmark: times the machine's reply at every level of
+engine.LEVELS over a fixed set of positions from all phases of the game,
+on this hardware, and checks that node-budget levels pick the same moves
+when run twice.
+
+    python tools/level_bench.py [--levels novice,hard] [--positions 4] [-o levels.jsonl]
+
+Prints a table, and with -o appends one JSON object per level (with the
+machine it ran on) so latencies on different devices can be compared.
+'''
+from os import path
+from time import perf_counter
+import argparse
+import json
+import platform
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from positions import benchmark_positions
+
+from engine import BLACK, LEVELS, WHITE, Reversi
+
+PHASE_EMPTIES = (50, 40, 30, 20, 16, 14, 12, 10) # the last ones reach the endgame solver
+
+
+def replies(level, positions):
+    ''' return [(seconds, nodes, depth, square)] of the machine's reply in each position '''
+    stats = []
+    engine = Reversi(8, lambda msg, *args: stats.append(args[0]) if msg == 'search_stats' else None, lambda _: None)
+    engine.set_level(level)
+    results = []
+    for P, O in positions:
+        engine.new_game()
+        engine.board.bits[BLACK], engine.board.bits[WHITE] = P, O
+        engine.turn = engine.player = BLACK
+        stats.clear()
+        start = perf_counter()
+        move = engine.search_best_move()
+        seconds = perf_counter() - start
+        final = [ s for s in stats if s['final'] ][-1]
+        results.append((seconds, final['nodes'], final['depth'], engine.board.square(*move)))
+    engine.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', help='comma-separated level names (default: all)')
+    parser.add_argument('--positions', type=int, default=4, help='positions per game phase')
+    parser.add_argument('-o', '--output', help='JSON lines file, appended to')
+    args = parser.parse_args()
+
+    levels = args.levels.split(',') if args.levels else list(LEVELS)
+    positions = sum((benchmark_positions(count=args.positions, empties=e) for e in PHASE_EMPTIES), [])
+    info = { 'python': platform.python_version(), 'implementation': platform.python_implementation(), 'machine': platform.machine() }
+
+    print('{:>10} {:>10} {:>10} {:>10} {:>6} {:>13}'.format('level', 'mean s', 'max s', 'nodes', 'depth', 'deterministic'))
+    for level in levels:
+        results = replies(level, positions)
+        seconds = [ r[0] for r in results ]
+        deterministic = None
+        if LEVELS[level].get('node_budget'):
+            deterministic = [ r[3] for r in results ] == [ r[3] for r in replies(level, positions) ]
+        row = dict(info, level=level, settings=LEVELS[level], positions=len(results),
+            mean_seconds=sum(seconds) / len(seconds), max_seconds=max(seconds),
+            mean_nodes=sum(r[1] for r in results) / len(results),
+            mean_depth=sum(r[2] for r in results) / len(results), deterministic=deterministic)
+        print('{:>10} {:10.3f} {:10.3f} {:10.0f} {:6.1f} {:>13}'.format(level, row['mean_seconds'], row['max_seconds'],
+            row['mean_nodes'], row['mean_depth'], '-' if deterministic is None else 'yes' if deterministic else 'NO'))
+        if args.output:
+            with open(args.output, 'a') as f:
+                f.write(json.dumps(row) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''
+Reader for OBF position files, as used by the FFO endgame test suite:
+
+    <64 squares a1..h8, X (black) O (white) or -> <side to move>; <move>:<score>; ...
+'''
+from bitboard import SIZE
+
+
+def parse_board(squares, side):
+    ''' return (P, O) bitboards for the side to move '''
+    squares = squares.strip()
+    if len(squares) != SIZE * SIZE:
+        raise ValueError('bad board: {}'.format(squares))
+    black = sum(1 << i for i, c in enumerate(squares) if c in 'Xx*')
+    white = sum(1 << i for i, c in enumerate(squares) if c in 'Oo')
+    return (black, white) if side.strip().upper() in ('X', '*') else (white, black)
+
+
+def format_board(P, O, black_to_move=True):
+    X, O = (P, O) if black_to_move else (O, P)
+    board = ''.join('X' if X >> i & 1 else 'O' if O >> i & 1 else '-' for i in range(SIZE * SIZE))
+    return '{} {}'.format(board, 'X' if black_to_move else 'O')
+
+
+''' yield (P, O, {move name: score}, line) for each position in an OBF file '''
+def read_obf(filename):
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('%'):
+                continue
+            fields = [ i.strip() for i in line.split(';') ]
+            board, side = fields[0][:SIZE * SIZE], fields[0][SIZE * SIZE:]
+            P, O = parse_board(board, side)
+            scores = {}
+            for field in fields[1:]:
+                if ':' in field:
+                    move, score = field.split(':')
+                    scores[move.strip().lower()] = int(score)
+            yield P, O, scores, line
@@ -0,0 +1,63 @@
+'''
+Move ordering benchmark: searches a fixed position set to the same depth
+with the ordering heuristics off (table move first only) and on (plus
+killers, history and shallow-search ordering), and compares node counts,
+time, first-move cutoff rate and effective branching factor.
+
+    python tools/ordering_bench.py [--depth 6] [positions.obf]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from positions import benchmark_positions
+
+from search import Search
+from tt import TranspositionTable
+
+
+def run(positions, depth, ordering, tt_mb):
+    search = Search(tt=TranspositionTable(tt_mb))
+    search.ordering = ordering
+    totals = { 'nodes': 0, 'cutoffs': 0, 'first_cutoffs': 0, 'time': 0 }
+    results = []
+    for P, O in positions:
+        search.tt.clear()
+        start = perf_counter()
+        results.append(search.best_move(P, O, depth)[1])
+        totals['time'] += perf_counter() - start
+        totals['nodes'] += search.nodes
+        totals['cutoffs'] += search.cutoffs
+        totals['first_cutoffs'] += search.first_cutoffs
+    return totals, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='OBF files (default: seeded random positions)')
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--positions', type=int, default=8)
+    parser.add_argument('--empties', type=int, default=40, help='empty squares in random positions')
+    parser.add_argument('--tt-mb', type=int, default=16)
+    args = parser.parse_args()
+
+    positions = benchmark_positions(args.files, args.positions, args.empties)
+    print('{:>9} {:>12} {:>9} {:>12} {:>6}'.format('ordering', 'nodes', 'time', 'first cut %', 'ebf'))
+    baseline = None
+    for ordering in (False, True):
+        totals, scores = run(positions, args.depth, ordering, args.tt_mb)
+        ebf = (totals['nodes'] / len(positions)) ** (1 / args.depth)
+        print('{:>9} {:>12} {:>9.2f} {:>12.1f} {:>6.2f}'.format(
+            'on' if ordering else 'off', totals['nodes'], totals['time'],
+            100 * totals['first_cutoffs'] / max(1, totals['cutoffs']), ebf))
+        if baseline is None:
+            baseline = totals, scores
+    print('nodes: {:.1%} of baseline, scores {}'.format(
+        totals['nodes'] / baseline[0]['nodes'], 'match' if scores == baseline[1] else 'DIFFER'))
+
+
+if __name__ == '__main__':
+    main()
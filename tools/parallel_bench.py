@@ -0,0 +1,58 @@
+'''
+Scaling benchmark of the parallel root-split search: searches a fixed
+position set to a fixed depth with 1 (serial), 2, 4, 8 and 16 workers,
+reporting time, nodes and speedup, and checking that every run returns
+the same move and score as the serial search.
+
+    python tools/parallel_bench.py [--depth 6] [--workers 1 2 4 8 16] [positions.obf]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from positions import benchmark_positions
+
+from parallel import ParallelSearch
+from search import Search
+from tt import TranspositionTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='OBF files (default: seeded random positions)')
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--positions', type=int, default=8)
+    parser.add_argument('--empties', type=int, default=40, help='empty squares in random positions')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--tt-mb', type=int, default=16)
+    args = parser.parse_args()
+
+    positions = benchmark_positions(args.files, args.positions, args.empties)
+    serial_time, serial_results = None, None
+    print('{:>7} {:>12} {:>9} {:>8} {:>10}'.format('workers', 'nodes', 'time', 'speedup', 'same'))
+    for workers in args.workers:
+        if workers > 1:
+            search = ParallelSearch(workers, tt=TranspositionTable(args.tt_mb), worker_tt_mb=args.tt_mb)
+            search.best_move(*positions[0], 2 * args.depth // 3) # warm up the pool
+        else:
+            search = Search(tt=TranspositionTable(args.tt_mb))
+        nodes, elapsed, results = 0, 0, []
+        for P, O in positions:
+            search.tt.clear()
+            start = perf_counter()
+            results.append(search.best_move(P, O, args.depth))
+            elapsed += perf_counter() - start
+            nodes += search.nodes
+        if workers > 1:
+            search.close()
+        if serial_time is None:
+            serial_time, serial_results = elapsed, results
+        same = sum(a == b for a, b in zip(results, serial_results))
+        print('{:>7} {:>12} {:>9.2f} {:>8.2f} {:>6}/{:<3}'.format(workers, nodes, elapsed, serial_time / elapsed, same, len(results)))
+
+
+if __name__ == '__main__':
+    main()
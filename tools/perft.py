@@ -0,0 +1,125 @@
+'''
+Perft: count the leaf nodes of the game tree to a fixed depth with the
+bitboard move generator the engine plays with, check the counts against
+reference values and time each depth.
+
+    python tools/perft.py [--depth 9] [--positions start,star] [--reference]
+
+A pass counts as a move; a finished game is a leaf wherever it ends. The
+initial position's counts are the published ones; the rest of the corpus
+exercises passes, double passes and long flips, and its counts come from
+the square-by-square reference generator below (--reference runs it
+instead of the bitboards). Prints one JSON object per position and
+depth; exits with status 1 if any count is wrong.
+'''
+from os import path
+from time import perf_counter
+import argparse
+import json
+import platform
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from obf import parse_board
+
+from bitboard import moves, play, popcount, squares
+
+# (name, board a1..h8 and side to move, {depth: leaf count})
+POSITIONS = (
+    ('start', '---------------------------OX------XO--------------------------- X', {
+        1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216,
+        9: 3005288, 10: 24571284, 11: 212258800, 12: 1939886636 }),
+    # h1 flips the whole north edge
+    ('edge', 'XOOOOOO--------------------XO------OX--------------------------- X', {
+        1: 5, 2: 16, 3: 80, 4: 362, 5: 2162, 6: 12804, 7: 89869, 8: 631246 }),
+    # the only move, d4, flips in all 8 directions and wipes out white: pass, then game over
+    ('star', 'X--X--X--O-O-O----OOO---XOO-OOOX--OOO----O-O-O--X--O--O----X---X X', {
+        1: 1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 1, 8: 1 }),
+    # games that end by wipe-out, with empties left, from depth 3
+    ('wipeout', '-------------------X-------XXX-----OO--------------------------- X', {
+        1: 4, 2: 12, 3: 56, 4: 288, 5: 1784, 6: 11906, 7: 85991, 8: 691819 }),
+    # black must pass at the root
+    ('pass', 'X-X------XXX----OOOXX---OOOXXXX-OOOOXXXXOOOOOX--OOOOXOX-OOOOOOOO X', {
+        1: 1, 2: 12, 3: 27, 4: 287, 5: 976, 6: 9169, 7: 36720, 8: 299201 }),
+)
+
+
+def perft(P, O, depth, passed=False):
+    if depth == 0:
+        return 1
+    m = moves(P, O)
+    if not m:
+        if passed:
+            return 1 # game over
+        return perft(O, P, depth - 1, True)
+    if depth == 1:
+        return popcount(m)
+    return sum(perft(*play(P, O, sq), depth - 1) for sq in squares(m))
+
+
+# square-by-square move generator, independent of the bitboard code
+STEPS = [ (dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc ]
+
+
+def reference_flips(P, O, sq):
+    if (P | O) >> sq & 1:
+        return 0
+    flipped = 0
+    row, col = divmod(sq, 8)
+    for dr, dc in STEPS:
+        r, c, run = row + dr, col + dc, 0
+        while 0 <= r < 8 and 0 <= c < 8 and O >> (8 * r + c) & 1:
+            run |= 1 << (8 * r + c)
+            r, c = r + dr, c + dc
+        if run and 0 <= r < 8 and 0 <= c < 8 and P >> (8 * r + c) & 1:
+            flipped |= run
+    return flipped
+
+
+def reference_perft(P, O, depth, passed=False):
+    if depth == 0:
+        return 1
+    children = []
+    for sq in range(64):
+        f = reference_flips(P, O, sq)
+        if f:
+            children.append((O & ~f, P | f | (1 << sq)))
+    if not children:
+        if passed:
+            return 1
+        return reference_perft(O, P, depth - 1, True)
+    return sum(reference_perft(p, o, depth - 1) for p, o in children)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--depth', type=int, default=8, help='deepest depth for each position')
+    parser.add_argument('--positions', help='comma-separated names (default: all)')
+    parser.add_argument('--reference', action='store_true', help='count with the square-by-square generator')
+    args = parser.parse_args()
+
+    names = args.positions.split(',') if args.positions else [ name for name, _, _ in POSITIONS ]
+    count = reference_perft if args.reference else perft
+    info = { 'python': platform.python_version(), 'implementation': platform.python_implementation(), 'machine': platform.machine() }
+    failed = 0
+    for name, board, expected in POSITIONS:
+        if name not in names:
+            continue
+        P, O = parse_board(board[:64], board[64:])
+        for depth in range(1, args.depth + 1):
+            start = perf_counter()
+            nodes = count(P, O, depth)
+            seconds = perf_counter() - start
+            ok = expected.get(depth, nodes) == nodes
+            failed += not ok
+            print(json.dumps(dict(info, generator='reference' if args.reference else 'bitboard',
+                position=name, depth=depth, nodes=nodes, expected=expected.get(depth), ok=ok,
+                seconds=round(seconds, 6), nps=round(nodes / seconds) if seconds else None)))
+            sys.stdout.flush()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Deterministic position sets for benchmarks: seeded random playouts from
+the initial position, or positions read from OBF files.
+'''
+import random
+
+from obf import read_obf
+
+from bitboard import FULL, START_BLACK, START_WHITE, moves, play, popcount, squares
+
+
+def random_position(empties, rng):
+    ''' play random moves until the board has the given number of empties; None if the game ends first '''
+    P, O = START_BLACK, START_WHITE
+    while popcount(~(P | O) & FULL) > empties:
+        m = moves(P, O)
+        if not m:
+            if not moves(O, P):
+                return None
+            P, O = O, P
+            continue
+        P, O = play(P, O, rng.choice(list(squares(m))))
+    return (P, O) if moves(P, O) else None
+
+
+''' return [(P, O)] from the OBF files, or else count random positions with the given empties '''
+def benchmark_positions(files=(), count=8, empties=40, seed=2020):
+    if files:
+        return [ (P, O) for filename in files for P, O, _, _ in read_obf(filename) ][:count]
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        pos = random_position(empties, rng)
+        if pos:
+            positions.append(pos)
+    return positions
@@ -0,0 +1,58 @@
+'''
+Search mode benchmark: runs iterative deepening to the same depth over a
+fixed position set with plain alpha-beta and with principal variation
+search (null-window probes after the first move, aspiration windows from
+the third iteration on), and compares node counts, time to depth and
+results.
+
+    python tools/pvs_bench.py [--depth 7] [positions.obf]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from positions import benchmark_positions
+
+from search import Search
+from tt import TranspositionTable
+
+
+def run(positions, depth, pvs, tt_mb):
+    search = Search(tt=TranspositionTable(tt_mb))
+    search.pvs = pvs
+    nodes, seconds, results = 0, 0, []
+    for P, O in positions:
+        search.tt.clear()
+        start = perf_counter()
+        results.append(search.iterative_deepening(P, O, None, max_depth=depth)[1])
+        seconds += perf_counter() - start
+        nodes += search.nodes
+    return nodes, seconds, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='OBF files (default: seeded random positions)')
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--positions', type=int, default=8)
+    parser.add_argument('--empties', type=int, default=40, help='empty squares in random positions')
+    parser.add_argument('--tt-mb', type=int, default=16)
+    args = parser.parse_args()
+
+    positions = benchmark_positions(args.files, args.positions, args.empties)
+    print('{:>10} {:>12} {:>9} {:>12}'.format('search', 'nodes', 'time', 'nodes/s'))
+    baseline = None
+    for pvs in (False, True):
+        nodes, seconds, scores = run(positions, args.depth, pvs, args.tt_mb)
+        print('{:>10} {:>12} {:>9.2f} {:>12.0f}'.format('pvs' if pvs else 'alphabeta', nodes, seconds, nodes / seconds))
+        if baseline is None:
+            baseline = nodes, seconds, scores
+    print('nodes: {:.1%}, time: {:.1%} of alpha-beta, scores {}'.format(
+        nodes / baseline[0], seconds / baseline[1], 'match' if scores == baseline[2] else 'DIFFER'))
+
+
+if __name__ == '__main__':
+    main()
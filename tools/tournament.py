@@ -0,0 +1,230 @@
+'''
+Headless engine-vs-engine tournament: plays each opening twice with the
+colours swapped, on a pool of worker processes, appends every game to a
+JSON lines file as it finishes, and reports the Elo difference of engine
+A over engine B with a 95% confidence interval. With --sprt the match
+stops as soon as a sequential probability ratio test accepts elo0 or
+elo1.
+
+    python tools/tournament.py --a time=0.2 --b time=0.2,patterns=data/patterns.bin \\
+        --workers 4 --openings 100 -o results.jsonl --sprt 0 10
+
+Engine options, comma-separated key=value: depth (fixed search depth),
+time (seconds per move; overrides depth), nodes (node budget per move;
+overrides depth), endgame (empties to solve exactly), tt (table MB),
+pvs (1 for principal variation search), patterns (weights file),
+probcut (Multi-ProbCut parameters file), book (book file).
+Openings are a file of transcripts (see build_book.py), or all distinct
+positions (up to symmetry) after --opening-plies moves, shuffled.
+
+Games are driven through engine.Reversi exactly as the app drives them:
+do_machine_move for the side to move, passes through notify_cannot_move,
+and the move is replayed on the opponent's engine.
+'''
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import log, log10, sqrt
+from os import path
+from time import perf_counter
+import argparse
+import json
+import random
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from build_book import read_games
+
+from bitboard import START_BLACK, START_WHITE, moves, play, square_name, squares
+from book import canonical
+from engine import BLACK, WHITE, Reversi
+
+_engines = {} # per worker process, by colour and options
+
+
+def parse_options(text):
+    options = dict(depth=4, time=None, nodes=None, endgame=12, tt=16, pvs=0, patterns=None, probcut=None, book=None)
+    for item in filter(None, text.split(',')):
+        key, value = item.split('=', 1)
+        if key not in options:
+            raise ValueError('unknown engine option: {}'.format(key))
+        options[key] = value if key in ('patterns', 'probcut', 'book') else float(value) if key == 'time' else int(value)
+    return options
+
+
+def make_engine(player, options):
+    key = (player,) + tuple(sorted(options.items()))
+    if key not in _engines:
+        stats = []
+        engine = Reversi(8, lambda msg, *args: stats.append(args[0]) if msg == 'search_stats' else None, lambda _: None)
+        engine.lookAhead = options['depth']
+        engine.time_budget = options['time']
+        engine.node_budget = options['nodes']
+        engine.endgame_empties = options['endgame']
+        engine.tt_size_mb = options['tt']
+        engine.pvs = bool(options['pvs'])
+        if options['patterns']:
+            engine.open_patterns(options['patterns'])
+        if options['probcut']:
+            engine.open_probcut(options['probcut'])
+        if options['book']:
+            engine.open_book(options['book'])
+        _engines[key] = engine, stats
+    return _engines[key]
+
+
+'''
+Play one game from the opening squares; options[BLACK], options[WHITE]
+configure the engines. Return the game record as a dict.
+'''
+def play_game(opening, options):
+    engines = {}
+    for player in (BLACK, WHITE):
+        engine, stats = make_engine(player, options[player])
+        engine.new_game()
+        engine.player = player
+        stats.clear()
+        engines[player] = engine, stats
+    board = engines[BLACK][0].board
+    for sq in opening:
+        for engine, _ in engines.values():
+            if not engine.can_move(engine.turn):
+                engine.turn ^= 1 # pass
+            engine.play_with_undo(engine.turn, board.coords(sq), undo=False, update=False)
+
+    start = perf_counter()
+    turn = engines[BLACK][0].turn
+    while True:
+        engine, _ = engines[turn]
+        other, _ = engines[turn ^ 1]
+        if engine.is_game_over():
+            break
+        played = len(engine.board.playLog)
+        engine.do_machine_move()
+        if len(engine.board.playLog) > played:
+            player, move = engine.board.playLog[-1]
+            other.play_with_undo(player, move, undo=False, update=False)
+        else:
+            other.notify_cannot_move()
+        turn = engine.turn
+
+    white, black = engine.board.score
+    return {
+        'opening': ''.join(square_name(sq) for sq in opening),
+        'moves': ''.join(square_name(engine.board.square(*move)) for _, move in engine.board.playLog),
+        'black_discs': black,
+        'white_discs': white,
+        'nodes': { name: sum(s['nodes'] for s in engines[player][1] if s['final']) for player, name in ((BLACK, 'black'), (WHITE, 'white')) },
+        'seconds': perf_counter() - start,
+    }
+
+
+def generate_openings(plies, seed):
+    ''' all distinct positions (up to symmetry) after plies moves, as move lists, shuffled '''
+    openings, seen = [], set()
+    def expand(P, O, played):
+        if len(played) == plies:
+            key = canonical(P, O)[0]
+            if key not in seen:
+                seen.add(key)
+                openings.append(played)
+            return
+        m = moves(P, O)
+        if not m:
+            return # too short to be an opening
+        for sq in squares(m):
+            expand(*play(P, O, sq), played + [sq])
+    expand(START_BLACK, START_WHITE, [])
+    random.Random(seed).shuffle(openings)
+    return openings
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * log10(1 / score - 1)
+
+
+def summary(results):
+    ''' return (games, wins, draws, losses, elo, elo low, elo high, score variance per game) for A '''
+    n = len(results)
+    wins, draws = results.count(1), results.count(.5)
+    mean = sum(results) / n
+    var = sum((r - mean) ** 2 for r in results) / n
+    margin = 1.96 * sqrt(var / n)
+    return n, wins, draws, n - wins - draws, elo(mean), elo(mean - margin), elo(mean + margin), var
+
+
+def sprt_llr(results, elo0, elo1):
+    ''' generalised SPRT log-likelihood ratio of elo1 against elo0, normal approximation '''
+    n, *_, var = summary(results)
+    if not var:
+        return 0
+    s0, s1, mean = expected_score(elo0), expected_score(elo1), sum(results) / n
+    return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * var)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--a', default='', help='engine A options')
+    parser.add_argument('--b', default='', help='engine B options')
+    parser.add_argument('-o', '--output', required=True, help='JSON lines file, appended to')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--openings', type=int, default=50, help='number of openings, each played twice')
+    parser.add_argument('--opening-file', help='transcripts to take the openings from')
+    parser.add_argument('--opening-plies', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), help='stop when H0: elo0 or H1: elo1 is accepted')
+    parser.add_argument('--alpha', type=float, default=.05)
+    parser.add_argument('--beta', type=float, default=.05)
+    args = parser.parse_args()
+
+    engines = { 'A': parse_options(args.a), 'B': parse_options(args.b) }
+    if args.opening_file:
+        openings = list(read_games(args.opening_file))
+    else:
+        openings = generate_openings(args.opening_plies, args.seed)
+    openings = openings[:args.openings]
+    lower, upper = log(args.beta / (1 - args.alpha)), log((1 - args.beta) / args.alpha)
+
+    results, verdict = [], None
+    with ProcessPoolExecutor(args.workers) as pool, open(args.output, 'a') as out:
+        pending = {}
+        for i, opening in enumerate(openings):
+            for black, white in (('A', 'B'), ('B', 'A')):
+                future = pool.submit(play_game, opening, { BLACK: engines[black], WHITE: engines[white] })
+                pending[future] = i, black, white
+        while pending and not verdict:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, black, white = pending.pop(future)
+                game = future.result()
+                margin = game['black_discs'] - game['white_discs']
+                if black == 'B':
+                    margin = -margin
+                result = 1 if margin > 0 else .5 if margin == 0 else 0
+                results.append(result)
+                game.update(game=len(results), opening_index=i, black=black, white=white, result_a=result, options=engines)
+                out.write(json.dumps(game) + '\n')
+                out.flush()
+                if args.sprt:
+                    llr = sprt_llr(results, *args.sprt)
+                    if llr >= upper:
+                        verdict = 'H1 accepted (elo >= {})'.format(args.sprt[1])
+                    elif llr <= lower:
+                        verdict = 'H0 accepted (elo <= {})'.format(args.sprt[0])
+            n, w, d, l, e, lo, hi, _ = summary(results)
+            line = 'games {} +{} ={} -{}  elo {:+.1f} [{:+.1f}, {:+.1f}]'.format(n, w, d, l, e, lo, hi)
+            if args.sprt:
+                line += '  llr {:.2f} [{:.2f}, {:.2f}]'.format(sprt_llr(results, *args.sprt), lower, upper)
+            print(line, flush=True)
+        for future in pending:
+            future.cancel()
+    if verdict:
+        print('SPRT:', verdict)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+'''
+Fit the pattern-table evaluation (patterns.py) to game outcomes by
+regularised least squares, one set of tables per game phase, and write
+the weights file the engine loads from data/patterns.bin.
+
+    python tools/train_patterns.py selfplay --games 2000 -o data/patterns.bin
+    python tools/train_patterns.py import games.txt ... -o data/patterns.bin
+
+Every position of every game is a sample, labelled with the final disc
+margin for the side to move. Each sample is added in all 8 symmetric
+orientations unless --no-augment is given. Needs NumPy; the engine does not.
+'''
+from os import path
+from time import perf_counter
+import argparse
+import sys
+
+import numpy as np
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from build_book import read_games, self_play
+
+import batch
+from bitboard import START_BLACK, START_WHITE, SYMMETRIES, final_margin
+from book import replay
+from patterns import HEADER, MAGIC, PHASES, VERSION, WEIGHT_SCALE, layout
+
+
+def samples(games):
+    ''' return (P, O, margin for P) arrays for every position of every game '''
+    P, O, y = [], [], []
+    for played in games:
+        game, final = replay(played, START_BLACK, START_WHITE)
+        margin = final_margin(*final)
+        for p, o, _, sign in game:
+            P.append(p)
+            O.append(o)
+            y.append(sign * margin)
+    return np.array(P, np.uint64), np.array(O, np.uint64), np.array(y, np.float64)
+
+
+def features(P, O, augment):
+    '''
+    Return the (samples, instances) matrix of table indices, offsets
+    included; with augment, stack the indices of the 8 symmetric images.
+    '''
+    patterns, _ = layout()
+    one = np.uint64(1)
+    symmetries = SYMMETRIES if augment else SYMMETRIES[:1]
+    blocks = []
+    for _, inverse in symmetries:
+        columns = []
+        for _, offset, _, group in patterns:
+            for squares in group:
+                index = np.full(len(P), offset, np.int32)
+                for digit, sq in enumerate(squares):
+                    # the instance square seen on the transformed board
+                    sq = np.uint64(inverse(1 << sq).bit_length() - 1)
+                    index += 3 ** digit * ((P >> sq & one) + 2 * (O >> sq & one)).astype(np.int32)
+                columns.append(index)
+        blocks.append(np.stack(columns, axis=1))
+    return np.concatenate(blocks)
+
+
+def fit(F, y, size, ridge, iterations):
+    '''
+    Minimise |A w - y|^2 + ridge |w|^2 by conjugate gradients, where row i
+    of the sparse 0/1 matrix A selects the table entries F[i].
+    '''
+    width = F.shape[1]
+    flat = F.ravel()
+
+    def A(w):
+        return w[F].sum(axis=1)
+
+    def At(r):
+        return np.bincount(flat, weights=np.repeat(r, width), minlength=size)
+
+    def normal(w):
+        return At(A(w)) + ridge * w
+
+    w = np.zeros(size)
+    r = At(y)
+    d = r.copy()
+    rr = r @ r
+    for _ in range(iterations):
+        if rr < 1e-9:
+            break
+        q = normal(d)
+        step = rr / (d @ q)
+        w += step * d
+        r -= step * q
+        rr, rr_old = r @ r, rr
+        d = r + (rr / rr_old) * d
+    return w
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', choices=('selfplay', 'import'))
+    parser.add_argument('files', nargs='*', help='game collections to import')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--games', type=int, default=2000, help='self-play games')
+    parser.add_argument('--depth', type=int, default=2, help='self-play search depth')
+    parser.add_argument('--random-plies', type=int, default=12, help='random opening moves in self-play')
+    parser.add_argument('--endgame-empties', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ridge', type=float, default=1.0, help='L2 regularisation')
+    parser.add_argument('--iterations', type=int, default=200, help='conjugate gradient iterations per phase')
+    parser.add_argument('--no-augment', dest='augment', action='store_false', help='do not add symmetric images')
+    args = parser.parse_args()
+
+    if args.source == 'selfplay':
+        games = self_play(args.games, args.depth, args.random_plies, args.endgame_empties, args.seed)
+    else:
+        games = (game for filename in args.files for game in read_games(filename))
+
+    start = perf_counter()
+    P, O, y = samples(games)
+    print('{} positions in {:.1f}s'.format(len(y), perf_counter() - start))
+
+    _, size = layout()
+    discs = batch.popcount(P | O)
+    phases = np.minimum(PHASES - 1, (discs - 4) * PHASES // 60)
+    with open(args.output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, PHASES, size))
+        for phase in range(PHASES):
+            start = perf_counter()
+            sel = phases == phase
+            weights = np.zeros(size)
+            if sel.any():
+                F = features(P[sel], O[sel], args.augment)
+                target = np.tile(y[sel], len(F) // sel.sum())
+                weights = fit(F, target, size, args.ridge, args.iterations)
+                rms = np.sqrt(np.mean((weights[F].sum(axis=1) - target) ** 2))
+                print('phase {:2}: {:7} samples, rms error {:5.2f} discs, {:.1f}s'.format(phase, len(target), rms, perf_counter() - start))
+            table = np.clip(np.rint(weights * WEIGHT_SCALE), -32768, 32767).astype('<i2')
+            f.write(table.tobytes())
+    print('wrote', args.output)
+
+
+if __name__ == '__main__':
+    main()
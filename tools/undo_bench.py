@@ -0,0 +1,93 @@
+'''
+Undo/redo microbenchmark: plays a 60-ply game, then times full cycles of
+taking back every move and playing them all again, with the engine's
+per-ply XOR records (Reversi.seek) against the snapshot scheme they
+replaced (a Board copy per ply for undo, rebuilding the game from the
+move log for redo), and compares the memory each keeps per ply.
+
+    python tools/undo_bench.py [--cycles 1000] [--seed 0]
+'''
+from os import path
+from time import perf_counter
+import argparse
+import random
+import sys
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from bitboard import squares
+from engine import Reversi
+
+
+def play_game(rng):
+    ''' a random game of exactly 60 plies '''
+    while True:
+        game = Reversi(8, lambda *_: None, lambda _: None)
+        while not game.is_game_over():
+            if not game.can_move(game.turn):
+                game.notify_cannot_move()
+                continue
+            sq = rng.choice(list(squares(game.board.get_valid_moves(game.turn))))
+            game.play_with_undo(game.turn, game.board.coords(sq), update=False)
+        if len(game.undo) == 60:
+            return game
+
+
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        size += sum(deep_size(i, seen) for i in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(list(vars(obj).values()), seen)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycles', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    game = play_game(random.Random(args.seed))
+    plies = len(game.undo)
+    final = list(game.board.bits)
+
+    start = perf_counter()
+    for _ in range(args.cycles):
+        game.seek(0)
+        game.seek(plies)
+    records = perf_counter() - start
+    assert game.board.bits == final
+
+    # the snapshot scheme: a board copy per ply, rebuilt from the log on redo
+    log = list(game.board.playLog)
+    start = perf_counter()
+    for _ in range(args.cycles):
+        snapshots = []
+        game.new_game()
+        for player, move in log:
+            snapshots.append((game.board.copy(), game.turn))
+            game.play_with_undo(player, move, undo=False, update=False)
+        while snapshots:
+            game.board, game.turn = snapshots.pop()
+    snapshot = perf_counter() - start
+
+    game.new_game()
+    snapshots = []
+    for player, move in log:
+        snapshots.append((game.board.copy(), game.turn))
+        game.play_with_undo(player, move, undo=True, update=False)
+    record_bytes = deep_size(game.undo) / plies
+    snapshot_bytes = deep_size(snapshots) / plies
+
+    print('{} cycles of {} undos and {} redos'.format(args.cycles, plies, plies))
+    print('records:   {:8.1f} us/cycle {:8.0f} bytes/ply'.format(records / args.cycles * 1e6, record_bytes))
+    print('snapshots: {:8.1f} us/cycle {:8.0f} bytes/ply'.format(snapshot / args.cycles * 1e6, snapshot_bytes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+'''
+Zobrist hashing and a fixed-size transposition table.
+
+Positions are hashed relative to the side to move: a key covers the
+mover's discs and the opponent's discs with separate random tables, so
+"side to move" is part of the key without a separate term. Both the key
+of (P, O) and of the swapped pair (O, P) are carried through the search,
+which makes the update after a move or a pass purely incremental.
+'''
+from array import array
+import random
+
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = 127
+DEFAULT_SIZE_MB = 16
+
+_rng = random.Random(0x5EED)
+HASH_P = [ _rng.getrandbits(64) for _ in range(64) ]
+HASH_O = [ _rng.getrandbits(64) for _ in range(64) ]
+
+# hash of flipping the discs in one byte of the board: a flipped disc
+# changes sides, so it contributes to both the HASH_P and HASH_O terms
+def _byte_table(i):
+    table = []
+    for b in range(256):
+        h = 0
+        for bit in range(8):
+            if b >> bit & 1:
+                h ^= HASH_P[8 * i + bit] ^ HASH_O[8 * i + bit]
+        table.append(h)
+    return table
+
+FLIP0, FLIP1, FLIP2, FLIP3, FLIP4, FLIP5, FLIP6, FLIP7 = [ _byte_table(i) for i in range(8) ]
+
+
+def _hash(b, table):
+    h = 0
+    while b:
+        low = b & -b
+        h ^= table[low.bit_length() - 1]
+        b ^= low
+    return h
+
+
+def zobrist(P, O):
+    ''' return the keys of (P, O) and of (O, P) '''
+    return _hash(P, HASH_P) ^ _hash(O, HASH_O), _hash(O, HASH_P) ^ _hash(P, HASH_O)
+
+
+def zobrist_play(k, ks, flipped, sq):
+    ''' keys after the side to move plays sq flipping discs, see zobrist '''
+    f = (FLIP0[flipped & 0xFF] ^ FLIP1[flipped >> 8 & 0xFF] ^
+         FLIP2[flipped >> 16 & 0xFF] ^ FLIP3[flipped >> 24 & 0xFF] ^
+         FLIP4[flipped >> 32 & 0xFF] ^ FLIP5[flipped >> 40 & 0xFF] ^
+         FLIP6[flipped >> 48 & 0xFF] ^ FLIP7[flipped >> 56])
+    return ks ^ f ^ HASH_O[sq], k ^ f ^ HASH_P[sq]
+
+
+# entry data layout, low bits first: move (7), bound (2), depth (7), age (8), score
+SCORE_OFFSET = 1 << 31
+
+
+def pack(depth, bound, score, move, age):
+    return ((score + SCORE_OFFSET) << 24) | (age << 16) | (depth << 9) | (bound << 7) | move
+
+
+class TranspositionTable:
+    '''
+    Two-way buckets: the first slot is depth-preferred (but entries from an
+    older search age are always replaceable), the second always-replace.
+    '''
+    ENTRY_BYTES = 16 # 64-bit key + 64-bit packed data
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        buckets = max(1, size_mb * 2**20 // (2 * self.ENTRY_BYTES))
+        buckets = 1 << (buckets.bit_length() - 1) # round down to a power of 2
+        self.mask = buckets - 1
+        self.size_mb = size_mb
+        self.age = 0
+        self.clear()
+
+    @property
+    def capacity(self):
+        return len(self.keys)
+
+    def clear(self):
+        size = 2 * (self.mask + 1)
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+        self.used = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    ''' start a new search: entries of previous searches become replaceable '''
+    def new_search(self):
+        self.age = (self.age + 1) & 0xFF
+
+    ''' return (depth, bound, score, move) or None '''
+    def probe(self, key):
+        i = (key & self.mask) << 1
+        keys = self.keys
+        if keys[i] == key:
+            d = self.data[i]
+        elif keys[i + 1] == key:
+            d = self.data[i + 1]
+        else:
+            self.misses += 1
+            if keys[i] or keys[i + 1]:
+                self.collisions += 1
+            return None
+        self.hits += 1
+        return (d >> 9) & 0x7F, (d >> 7) & 3, (d >> 24) - SCORE_OFFSET, d & 0x7F
+
+    def store(self, key, depth, bound, score, move=NO_MOVE):
+        i = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        old = keys[i]
+        if old == key:
+            if move == NO_MOVE:
+                move = data[i] & 0x7F # keep the best move of a previous search
+        elif not old or (data[i] >> 16) & 0xFF != self.age or (data[i] >> 9) & 0x7F <= depth:
+            # take the depth-preferred slot, demoting its entry
+            if not old or not keys[i + 1]:
+                self.used += 1
+            if old:
+                keys[i + 1], data[i + 1] = old, data[i]
+        else:
+            i += 1
+            if keys[i] == key:
+                if move == NO_MOVE:
+                    move = data[i] & 0x7F
+            elif not keys[i]:
+                self.used += 1
+        keys[i] = key
+        data[i] = pack(depth, bound, score, move, self.age)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'used': self.used,
+            'capacity': self.capacity,
+            'hit_rate': self.hit_rate,
+        }
@@ -1,9 +1,24 @@
+from concurrent.futures import CancelledError
+import asyncio
+import heapq
+import logging
+import multiprocessing
 import threading
 from collections import deque
+from itertools import count
+from time import perf_counter
 
 
 __IN__, __OUT__ = 0, 1
 
+# send_message priorities: lower runs first, in order of sending within a level
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = ( 'interactive', 'normal', 'background' )
+
+PROCESS_POLL_INTERVAL = .01 # seconds between looks at is_cancelled() while a process job runs
+
+logger = logging.getLogger(__name__)
+
 
 class Locking:
     def __init__(self):
@@ -16,15 +31,123 @@ class Locking:
         return inner
 
 
+class Request:
+    '''
+    Handle on a job sent with send_message: poll it (done, result), wait
+    for it (result with a timeout), attach callbacks, await it in asyncio,
+    or cancel it. Its id tags the messages it posts. A job cancelled while
+    it runs is asked to stop (is_cancelled) and its late result and
+    messages are dropped.
+    '''
+    def __init__(self, request_id, work, priority, key=None, on_cancel=None):
+        self.id = request_id
+        self.work = work
+        self.priority = priority
+        self.key = key
+        self.__on_cancel = on_cancel
+        self.__lock = threading.Lock()
+        self.__done = threading.Event()
+        self.__cancelled = False
+        self.__result = self.__exception = None
+        self.__callbacks = []
+
+    def cancel(self):
+        with self.__lock:
+            if self.__done.is_set():
+                return False
+            self.__cancelled = True
+        if self.__on_cancel:
+            self.__on_cancel(self)
+        self.__finish()
+        return True
+
+    def cancelled(self):
+        return self.__cancelled
+
+    def done(self):
+        return self.__done.is_set()
+
+    ''' the job's return value, waiting up to timeout seconds (None: for ever) '''
+    def result(self, timeout=None):
+        if not self.__done.wait(timeout):
+            raise TimeoutError('request {} still running'.format(self.id))
+        if self.__cancelled:
+            raise CancelledError()
+        if self.__exception:
+            raise self.__exception
+        return self.__result
+
+    ''' call fn(request) when done, on the thread that finishes it (now, if done) '''
+    def add_done_callback(self, fn):
+        with self.__lock:
+            if not self.__done.is_set():
+                self.__callbacks.append(fn)
+                return
+        fn(self)
+
+    def __await__(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def done(request):
+            loop.call_soon_threadsafe(_settle, future, request)
+        self.add_done_callback(done)
+        return future.__await__()
+
+    ''' run the job on the worker thread, unless cancelled; return its result, or raise its exception (the Request gets either) '''
+    def run(self):
+        if self.__cancelled:
+            return None
+        try:
+            result = self.work()
+        except Exception as e:
+            self.__set(None, e)
+            raise
+        self.__set(result, None)
+        return result
+
+    def __set(self, result, exception):
+        with self.__lock:
+            if self.__done.is_set():
+                return # cancelled meanwhile
+            self.__result, self.__exception = result, exception
+        self.__finish()
+
+    def __finish(self):
+        with self.__lock:
+            self.__done.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+def _settle(future, request):
+    if future.done():
+        return
+    if request.cancelled():
+        future.cancel()
+    else:
+        try:
+            future.set_result(request.result())
+        except Exception as e:
+            future.set_exception(e)
+
+
 class WorkerThreadServer(Locking):
     def __init__(self):
         super().__init__()
         self.__thread = threading.Thread(target=self.__main)
         self.__thread.daemon = True
-        self.__queues = (deque(), deque())  # in / out
+        self.__queues = ([], deque())  # in: heap of (priority, sequence, time sent, Request) / out: (msg, args, Request)
+        self.__sequence = count()
+        self.__request = None # running on the worker thread
+        self.__waits = [ [0, 0.0, 0.0] for _ in PRIORITY_NAMES ] # jobs started, total and longest wait, by priority
         self.__events = (threading.Event(), threading.Event())
         self.__active = True
         self.__paused = False
+        self.__idle_task = None
+        self.__interrupted = False
+        self.__cancelled = False
+        self.__listeners = [] # called on the posting thread after each post
         self.__thread.start()
 
     @Locking.synchronized
@@ -34,24 +157,63 @@ class WorkerThreadServer(Locking):
     def __pop(self, inout):
         queue = self.__queues[inout]
         event = self.__events[inout]
-        m = queue.popleft() if queue else None
+        m = None
+        if inout == __IN__:
+            while queue and m is None:
+                priority, _, sent, m = heapq.heappop(queue)
+                if m.cancelled():
+                    m = None
+            if m is not None:
+                wait = perf_counter() - sent
+                waits = self.__waits[priority]
+                waits[0] += 1
+                waits[1] += wait
+                waits[2] = max(waits[2], wait)
+                self.__cancelled = False # queued after any cancel()
+        else:
+            while queue and m is None:
+                m = queue.popleft()
+                if m[2] and m[2].cancelled():
+                    m = None # late message of a cancelled request
+            if m is not None:
+                m = (m[0], m[1], m[2] and m[2].id)
         if not queue:
             event.clear()
         return m
 
+    ''' queue m; for inbound work return (its Request, the requests it supersedes or None if dropped) '''
     @Locking.synchronized
-    def __put_message(self, inout, m):
+    def __put_message(self, inout, m, priority=NORMAL, key=None):
+        queue = self.__queues[inout]
         if inout == __IN__:
             assert self.__active
+            request = Request(next(self.__sequence), m, priority, key, self.__cancel_request)
             if self.__paused:
-                return
-        queue = self.__queues[inout]
+                return request, None
+            last = max(queue, key=lambda e: e[1]) if queue else None # the latest still queued
+            if last and last[0] == priority and last[3].work == m and not last[3].cancelled():
+                return last[3], [] # redundant message?
+            superseded = []
+            if key is not None:
+                superseded = [ e[3] for e in queue if e[3].key == key ]
+                if self.__request and self.__request.key == key:
+                    superseded.append(self.__request)
+            heapq.heappush(queue, (priority, request.id, perf_counter(), request))
+            self.__events[inout].set()
+            running = self.__request
+            if running and running.priority == BACKGROUND and priority < BACKGROUND:
+                self.__cancelled = True # background work in flight yields, see is_cancelled
+            return request, superseded
         if queue and queue[-1] == m:
             return # redundant message?
-
         queue.append(m)
         self.__events[inout].set()
 
+    ''' Request.cancel hook: a request in flight is asked to stop '''
+    def __cancel_request(self, request):
+        if request is self.__request:
+            self.__cancelled = True
+
     def __get_message(self, inout):
         while True:
             self.__events[inout].wait()
@@ -59,6 +221,7 @@ class WorkerThreadServer(Locking):
             if m is not None:
                 return m
 
+    ''' drain the outbound queue: (msg, args, id of the request that posted it or None) '''
     @Locking.synchronized
     def messages(self):
         while True:
@@ -71,25 +234,127 @@ class WorkerThreadServer(Locking):
     def read_message(self):
         return self.__get_message(__OUT__)
 
-    ''' send message to worker '''
-    def send_message(self, m):
-        return self.__put_message(__IN__, m)
+    '''
+    Send message (a callable) to worker: it runs after the messages of
+    higher priority (INTERACTIVE, then NORMAL, then BACKGROUND) and the
+    ones of the same priority sent before it; a BACKGROUND message in
+    flight is asked to stop (is_cancelled) and finishes with what it has.
+    Sending with a key cancels the earlier requests with that key, queued
+    or running. Return its Request (already cancelled if the worker is
+    paused).
+    '''
+    def send_message(self, m, priority=NORMAL, key=None):
+        request, superseded = self.__put_message(__IN__, m, priority, key)
+        if superseded is None:
+            request.cancel()
+        for old in superseded or ():
+            old.cancel()
+        return request
+
+    ''' {priority name: {queued, started, mean_wait, max_wait}}, waits in seconds '''
+    @Locking.synchronized
+    def stats(self):
+        queued = [0] * len(PRIORITY_NAMES)
+        for priority, *_ in self.__queues[__IN__]:
+            queued[priority] += 1
+        return { name: {
+            'queued': queued[priority],
+            'started': started,
+            'mean_wait': total / started if started else 0,
+            'max_wait': longest,
+        } for priority, (name, (started, total, longest)) in enumerate(zip(PRIORITY_NAMES, self.__waits)) }
 
     def __main(self):
         while self.__active:
-            work_item = self.__get_message(__IN__)
-            self.post(work_item())
+            request = self.__get_message(__IN__)
+            self.__request = request
+            try:
+                request.run() # the result goes to the Request
+            except Exception as e:
+                logger.exception('request %s failed', request.id)
+                self.post('error', e) # or whoever waits for the job's messages would wait for ever
+            finally:
+                self.__request = None
+            self.__run_idle_task()
+
+    '''
+    Background work (such as pondering) to run whenever the inbound queue
+    drains. The task is called with a should_stop callable, which it must
+    poll: it returns True as soon as new work arrives or interrupt() is called.
+    '''
+    def set_idle_task(self, task):
+        self.__idle_task = task
+
+    def interrupt(self):
+        self.__interrupted = True
+
+    def __should_stop(self):
+        return self.__interrupted or self.__paused or not self.__active or self.__events[__IN__].is_set()
 
-    ''' post message to outbound queue '''
+    def __run_idle_task(self):
+        task = self.__idle_task
+        self.__interrupted = False
+        if task and not self.__should_stop():
+            task(self.__should_stop)
+
+    '''
+    post message to outbound queue, tagged with the request that posts it
+    (None from outside the worker thread); a cancelled request's are dropped
+    '''
     def post(self, msg, *args):
-        self.__put_message(__OUT__, (msg, args))
+        request = self.__request if threading.current_thread() is self.__thread else None
+        if request and request.cancelled():
+            return
+        self.__put_message(__OUT__, (msg, args, request))
+        for listener in self.__listeners:
+            listener()
+
+    '''
+    Call listener() whenever a message is posted, from the thread that posts
+    it, so that a consumer can wake up to read messages() instead of polling
+    '''
+    def add_listener(self, listener):
+        self.__listeners = self.__listeners + [ listener ]
+
+    def remove_listener(self, listener):
+        self.__listeners = [ i for i in self.__listeners if i != listener ]
 
-    @Locking.synchronized
     def pause(self):
+        result, dropped = self.__pause()
+        for request in dropped:
+            request.cancel()
+        return result
+
+    @Locking.synchronized
+    def __pause(self):
         result = not self.__paused
         self.__paused = True
-        self.__queues[__IN__].clear()
-        return result
+        self.__interrupted = True
+        return result, self.__drop_queued()
+
+    def __drop_queued(self):
+        queue = self.__queues[__IN__]
+        dropped = [ e[3] for e in queue ]
+        queue.clear()
+        return dropped
+
+    '''
+    Drop the queued work and cancel the work item in flight: is_cancelled()
+    returns True until the next item starts, and long-running items (the
+    machine's search) must poll it and give up.
+    '''
+    def cancel(self):
+        for request in self.__cancel():
+            request.cancel()
+
+    @Locking.synchronized
+    def __cancel(self):
+        self.__cancelled = True
+        self.__interrupted = True
+        return self.__drop_queued()
+
+    def is_cancelled(self):
+        return self.__cancelled
 
     @Locking.synchronized
     def resume(self):
@@ -110,21 +375,80 @@ class WorkerThreadServer(Locking):
         self.__thread.join()
         if exception: raise
 
+
+''' job loop of the WorkerProcessServer's child process '''
+def _process_main(conn, cancelled):
+    def notify(msg, *args):
+        conn.send(('message', msg, args))
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        func, args = job
+        try:
+            conn.send(('result', func(*args, notify=notify, cancelled=lambda: cancelled.value)))
+        except Exception as e:
+            conn.send(('error', e))
+
+
+class WorkerProcessServer(WorkerThreadServer):
+    '''
+    WorkerThreadServer whose heavy jobs run in a child process, so that a
+    CPU-bound search does not hold the GIL the UI thread needs. Work items
+    still run on the worker thread; they hand jobs over with run(), which
+    ships only a module-level function and its small, picklable arguments.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.__conn, child_conn = multiprocessing.Pipe()
+        self.__cancelled = multiprocessing.Value('b', False, lock=False)
+        self.__send_lock = threading.Lock()
+        self.__process = multiprocessing.Process(target=_process_main, args=(child_conn, self.__cancelled), daemon=True)
+        self.__process.start()
+
+    '''
+    Call func(*args, notify=, cancelled=) in the child process and return
+    its result; called from a work item. Messages func sends through
+    notify(msg, *args) go to notify here (post by default) as they come,
+    and cancelled() turns True there once is_cancelled() does here.
+    '''
+    def run(self, func, *args, notify=None):
+        notify = notify or self.post
+        self.__cancelled.value = False
+        with self.__send_lock:
+            self.__conn.send((func, args))
+        while True:
+            if not self.__conn.poll(PROCESS_POLL_INTERVAL):
+                if self.is_cancelled():
+                    self.__cancelled.value = True
+                continue
+            kind, *result = self.__conn.recv()
+            if kind == 'message':
+                msg, args = result
+                notify(msg, *args)
+            elif kind == 'error':
+                raise result[0]
+            else:
+                return result[0]
+
+    def stop(self):
+        super().stop()
+        self.__cancelled.value = True
+        with self.__send_lock:
+            self.__conn.send(None)
+
 '''
 if __name__ == '__main__':
     import random
 
     with WorkerThreadServer() as worker:            
-        worker.send_message(lambda: 'hello')
-        print (worker.read_message())
+        print (worker.send_message(lambda: 'hello').result())
 
-        worker.send_message(lambda: random.choice(range(1, 7)))
-        print (worker.read_message())
+        print (worker.send_message(lambda: random.choice(range(1, 7))).result())
 
-        worker.send_message(lambda: random.choice(range(1, 7)))
-        worker.send_message(lambda: random.choice(range(1, 7)))
+        rolls = [ worker.send_message(lambda: random.choice(range(1, 7))) for _ in range(2) ]
         worker.send_message(worker.stop)
-        
-        for m in worker.messages():
-            print(m)
+
+        for request in rolls:
+            print(request.id, request.result())
 '''